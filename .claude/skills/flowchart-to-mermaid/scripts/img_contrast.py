@@ -21,8 +21,17 @@ Examples:
     python img_contrast.py chart.png --grayscale --auto -o chart_clean.png
 """
 
-from img_utils import base_argparser, load_image, save_image, make_output_path
-from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+from img_utils import (base_argparser, load_image, save_image, make_output_path,
+                       auto_level, brightness_contrast, median_filter_fast)
+from PIL import ImageEnhance
+
+# これ以下の差は 1.0 (変化なし) とみなす。8bit 画素では結果が変わらない程度の差
+NEUTRAL_TOLERANCE = 1e-3
+
+
+def _is_neutral(factor: float) -> bool:
+    """倍率が実質 1.0 か。ImageEnhance は生成時点で全画素を走査するので、生成前に判定する。"""
+    return abs(factor - 1.0) <= NEUTRAL_TOLERANCE
 
 
 def main():
@@ -36,41 +45,36 @@ def main():
     parser.add_argument("--grayscale", action="store_true", help="グレースケール変換")
     args = parser.parse_args()
 
-    img = load_image(args.input)
+    # グレースケール変換（JPEG はデコード時に直接グレースケールにする）
+    img = load_image(args.input, mode="L" if args.grayscale else None)
     steps = []
-
-    # グレースケール変換
     if args.grayscale:
-        img = img.convert("L")
         steps.append("grayscale")
 
     # ノイズ除去（コントラスト強調の前に行う）
     if args.denoise:
-        img = img.filter(ImageFilter.MedianFilter(size=args.denoise_size))
+        img = median_filter_fast(img, size=args.denoise_size)
         steps.append(f"denoise(size={args.denoise_size})")
 
     # 自動レベル補正
     if args.auto:
-        if img.mode == "L":
-            img = ImageOps.autocontrast(img, cutoff=1)
-        else:
-            img = ImageOps.autocontrast(img.convert("RGB"), cutoff=1)
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        img = auto_level(img, cutoff=1)
         steps.append("auto-level")
 
-    # 明るさ調整
-    if args.brightness != 1.0:
-        enhancer = ImageEnhance.Brightness(img)
-        img = enhancer.enhance(args.brightness)
-        steps.append(f"brightness({args.brightness})")
-
-    # コントラスト強調
-    if args.factor != 1.0:
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(args.factor)
-        steps.append(f"contrast({args.factor})")
+    # 明るさ調整・コントラスト強調（1 回の LUT 適用にまとめる）
+    brightness = 1.0 if _is_neutral(args.brightness) else args.brightness
+    contrast = 1.0 if _is_neutral(args.factor) else args.factor
+    if brightness != 1.0 or contrast != 1.0:
+        img = brightness_contrast(img, brightness=brightness, contrast=contrast)
+        if brightness != 1.0:
+            steps.append(f"brightness({brightness})")
+        if contrast != 1.0:
+            steps.append(f"contrast({contrast})")
 
     # シャープネス
-    if args.sharpness != 1.0:
+    if not _is_neutral(args.sharpness):
         enhancer = ImageEnhance.Sharpness(img)
         img = enhancer.enhance(args.sharpness)
         steps.append(f"sharpness({args.sharpness})")
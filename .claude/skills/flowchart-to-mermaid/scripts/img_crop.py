@@ -19,18 +19,38 @@ Examples:
     python img_crop.py chart.png --margin 20 --box "100,50,800,600"
 """
 
-from img_utils import base_argparser, load_image, save_image, make_output_path
+from img_utils import (base_argparser, load_image, save_image, make_output_path, threshold_lut,
+                       as_array)
 from PIL import Image, ImageOps
 
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では Pillow の getbbox で処理する
+    np = None
+
 
 def auto_crop(img: Image.Image, threshold: int = 240) -> tuple[int, int, int, int]:
     """白い余白を自動検出してクロップ範囲を返す。"""
     gray = img.convert("L")
-    # threshold以下（暗い部分）をコンテンツとみなす
-    bbox = gray.point(lambda p: 0 if p > threshold else 255).getbbox()
-    if bbox is None:
+    if np is None:
+        # threshold以下（暗い部分）をコンテンツとみなす
+        bbox = gray.point(threshold_lut(threshold, below=255, above=0)).getbbox()
+        if bbox is None:
+            return (0, 0, img.size[0], img.size[1])
+        return bbox
+
+    # threshold以下（暗い部分）をコンテンツとみなし、行・列ごとの有無から範囲を求める
+    mask = as_array(gray) <= threshold
+    rows = mask.any(axis=1)
+    if not rows.any():
         return (0, 0, img.size[0], img.size[1])
-    return bbox
+    y0 = int(np.argmax(rows))
+    y1 = len(rows) - int(np.argmax(rows[::-1]))
+    # 列方向は上下の余白行を除いた帯だけを見れば十分
+    cols = mask[y0:y1].any(axis=0)
+    x0 = int(np.argmax(cols))
+    x1 = len(cols) - int(np.argmax(cols[::-1]))
+    return (x0, y0, x1, y1)
 
 
 def main():
@@ -49,17 +69,17 @@ def main():
         box = auto_crop(img, args.auto_threshold)
         print(f"🔍 Auto-detected content area: {box}")
     elif args.ratio:
-        parts = [float(x.strip()) for x in args.ratio.split(",")]
+        # int()/float() は前後の空白を無視するので strip は不要
+        parts = tuple(map(float, args.ratio.split(",")))
         if len(parts) != 4:
             parser.error("--ratio は x1,y1,x2,y2 形式で4値を指定")
             return
         box = (int(parts[0] * w), int(parts[1] * h), int(parts[2] * w), int(parts[3] * h))
     elif args.box:
-        parts = [int(x.strip()) for x in args.box.split(",")]
-        if len(parts) != 4:
+        box = tuple(map(int, args.box.split(",")))
+        if len(box) != 4:
             parser.error("--box は x1,y1,x2,y2 形式で4値を指定")
             return
-        box = tuple(parts)
     else:
         parser.error("--box, --ratio, --auto のいずれかを指定してください")
         return
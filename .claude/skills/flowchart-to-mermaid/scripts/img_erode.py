@@ -28,42 +28,172 @@ Examples:
     python img_erode.py chart.png --mode close --iterations 2 -o chart_clean.png
 """
 
-from img_utils import base_argparser, load_image, save_image, make_output_path
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from img_utils import (base_argparser, load_image, save_image, make_output_path, threshold_lut,
+                       as_array, from_array)
 from PIL import Image, ImageFilter
 
+try:
+    import numpy as np
+    from scipy import ndimage
+except ImportError:  # SciPy が無い環境では Pillow の MinFilter/MaxFilter で処理する
+    np = None
+    ndimage = None
+
+
+def _footprint(arr: "np.ndarray", kernel: int) -> tuple[int, ...]:
+    """カーネルサイズ。カラー画像 (HxWxC) はチャネル方向に広げない。"""
+    return (kernel, kernel) + (1,) * (arr.ndim - 2)
+
+
+# --- ndarray 版 (SciPy) ---
+
+def _iterate(op, arr: "np.ndarray", kernel: int, iterations: int) -> "np.ndarray":
+    """op を iterations 回繰り返す。2 枚の作業バッファを交互に使い回し、反復ごとの確保を避ける。"""
+    if iterations <= 0:
+        return arr
+    size = _footprint(arr, kernel)
+    src = arr
+    dst = np.empty_like(arr)
+    spare = np.empty_like(arr) if iterations > 1 else None
+    for _ in range(iterations):
+        op(src, size=size, output=dst)
+        # 入力 arr には書き込まない (as_array(img) は読み取り専用)
+        src, dst = dst, (spare if src is arr else src)
+    return src
+
+
+def _erode_array(arr: "np.ndarray", kernel: int, iterations: int) -> "np.ndarray":
+    return _iterate(ndimage.grey_erosion, arr, kernel, iterations)
+
+
+def _dilate_array(arr: "np.ndarray", kernel: int, iterations: int) -> "np.ndarray":
+    return _iterate(ndimage.grey_dilation, arr, kernel, iterations)
+
+
+def _edge_array(arr: "np.ndarray", kernel: int, threshold: int) -> "np.ndarray":
+    size = _footprint(arr, kernel)
+    # 膨張 >= 収縮 が常に成り立つので uint8 のまま引いてもアンダーフローしない
+    diff = ndimage.grey_dilation(arr, size=size) - ndimage.grey_erosion(arr, size=size)
+    if threshold > 0:
+        diff = np.where(diff > threshold, 255, 0).astype(np.uint8)
+    return diff
+
+
+def _apply_array(arr: "np.ndarray", mode: str, kernel: int, iterations: int,
+                 threshold: int = 0) -> "np.ndarray":
+    """mode に応じた演算を ndarray (HxW または HxWxC) に1回で適用する。"""
+    if mode == "erode":
+        return _erode_array(arr, kernel, iterations)
+    if mode == "dilate":
+        return _dilate_array(arr, kernel, iterations)
+    if mode == "edge":
+        return _edge_array(arr, kernel, threshold)
+    if mode == "open":
+        return _erode_array(_dilate_array(arr, kernel, iterations), kernel, iterations)
+    if mode == "close":
+        return _dilate_array(_erode_array(arr, kernel, iterations), kernel, iterations)
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def _apply_color_array(arr: "np.ndarray", n_channels: int, mode: str, kernel: int,
+                       iterations: int, threshold: int = 0) -> "np.ndarray":
+    """HxWxC の先頭 n_channels チャネルに演算を適用し、残り (アルファ) はそのまま残す。
+
+    SciPy のフィルタは C ループ中に GIL を解放するので、複数コアがあればチャネルごとにスレッドで並列化する。
+    """
+    workers = min(n_channels, os.cpu_count() or 1)
+    if workers <= 1:
+        # 1コアなら HxWxC のまま1回で処理した方が速い
+        result = _apply_array(arr[..., :n_channels], mode, kernel, iterations, threshold)
+        if n_channels == arr.shape[2]:
+            return result
+        return np.concatenate([result, arr[..., n_channels:]], axis=2)
+
+    out = np.empty_like(arr)
+    out[..., n_channels:] = arr[..., n_channels:]
+
+    def run(c: int) -> None:
+        out[..., c] = _apply_array(arr[..., c], mode, kernel, iterations, threshold)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(run, range(n_channels)))
+    return out
+
+
+# --- Image 版 ---
 
 def erode(img: Image.Image, kernel: int = 3, iterations: int = 1) -> Image.Image:
     """収縮: 暗い領域を広げる (= 線を太くする)"""
-    result = img
-    for _ in range(iterations):
-        result = result.filter(ImageFilter.MinFilter(kernel))
-    return result
+    if ndimage is None:
+        result = img
+        for _ in range(iterations):
+            result = result.filter(ImageFilter.MinFilter(kernel))
+        return result
+    return from_array(_erode_array(as_array(img), kernel, iterations))
 
 
 def dilate(img: Image.Image, kernel: int = 3, iterations: int = 1) -> Image.Image:
     """膨張: 明るい領域を広げる (= 線を細くする)"""
-    result = img
-    for _ in range(iterations):
-        result = result.filter(ImageFilter.MaxFilter(kernel))
-    return result
+    if ndimage is None:
+        result = img
+        for _ in range(iterations):
+            result = result.filter(ImageFilter.MaxFilter(kernel))
+        return result
+    return from_array(_dilate_array(as_array(img), kernel, iterations))
 
 
-def edge_detect(img: Image.Image, kernel: int = 3) -> Image.Image:
-    """エッジ抽出: 膨張 - 収縮 の差分"""
-    from PIL import ImageChops
-    dilated = dilate(img, kernel, 1)
-    eroded = erode(img, kernel, 1)
-    return ImageChops.difference(dilated, eroded)
+def edge_detect(img: Image.Image, kernel: int = 3, threshold: int = 0) -> Image.Image:
+    """エッジ抽出: 膨張 - 収縮 の差分。threshold > 0 なら同じパスで二値化する。"""
+    if ndimage is None:
+        from PIL import ImageChops
+        result = ImageChops.difference(dilate(img, kernel, 1), erode(img, kernel, 1))
+        if threshold > 0:
+            result = result.point(threshold_lut(threshold))
+        return result
+    return from_array(_edge_array(as_array(img), kernel, threshold))
 
 
 def opening(img: Image.Image, kernel: int = 3, iterations: int = 1) -> Image.Image:
     """オープニング: 膨張→収縮 (小さなノイズ除去)"""
-    return erode(dilate(img, kernel, iterations), kernel, iterations)
+    if ndimage is None:
+        return erode(dilate(img, kernel, iterations), kernel, iterations)
+    return from_array(_apply_array(as_array(img), "open", kernel, iterations))
 
 
 def closing(img: Image.Image, kernel: int = 3, iterations: int = 1) -> Image.Image:
     """クロージング: 収縮→膨張 (小さな隙間を埋める)"""
-    return dilate(erode(img, kernel, iterations), kernel, iterations)
+    if ndimage is None:
+        return dilate(erode(img, kernel, iterations), kernel, iterations)
+    return from_array(_apply_array(as_array(img), "close", kernel, iterations))
+
+
+def _apply_per_channel(img: Image.Image, mode: str, kernel: int, iterations: int,
+                       threshold: int) -> Image.Image:
+    """SciPy が無い場合: カラー画像をチャネル別に Pillow で処理する。"""
+    ops = {"erode": erode, "dilate": dilate, "open": opening, "close": closing}
+
+    def apply(im: Image.Image) -> Image.Image:
+        if mode == "edge":
+            return edge_detect(im, kernel, threshold)
+        return ops[mode](im, kernel, iterations)
+
+    if img.mode not in ("RGB", "RGBA"):
+        return apply(img)
+
+    channels = img.split()
+    alpha = None
+    if img.mode == "RGBA":
+        alpha = channels[3]
+        channels = channels[:3]
+
+    processed = [apply(ch) for ch in channels]
+
+    if alpha:
+        return Image.merge("RGBA", (*processed, alpha))
+    return Image.merge("RGB", tuple(processed))
 
 
 def main():
@@ -82,42 +212,23 @@ def main():
         return
 
     img = load_image(args.input)
+    if img.mode == "P":
+        # パレットモードはインデックス値のままでは演算できないので RGB に変換
+        img = img.convert("RGB")
 
-    # グレースケールに変換して処理（カラー画像はチャネル別に処理）
-    if img.mode in ("RGB", "RGBA"):
-        channels = img.split()
-        alpha = None
-        if img.mode == "RGBA":
-            alpha = channels[3]
-            channels = channels[:3]
-
-        ops = {"erode": erode, "dilate": dilate, "edge": edge_detect,
-               "open": opening, "close": closing}
-
-        if args.mode == "edge":
-            processed = [ops[args.mode](ch, args.kernel) for ch in channels]
-        else:
-            processed = [ops[args.mode](ch, args.kernel, args.iterations) for ch in channels]
-
-        if alpha:
-            result = Image.merge("RGBA", (*processed, alpha))
-        else:
-            result = Image.merge("RGB", tuple(processed))
+    if ndimage is None:
+        result = _apply_per_channel(img, args.mode, args.kernel, args.iterations, args.threshold)
     else:
-        if args.mode == "erode":
-            result = erode(img, args.kernel, args.iterations)
-        elif args.mode == "dilate":
-            result = dilate(img, args.kernel, args.iterations)
-        elif args.mode == "edge":
-            result = edge_detect(img, args.kernel)
-        elif args.mode == "open":
-            result = opening(img, args.kernel, args.iterations)
-        elif args.mode == "close":
-            result = closing(img, args.kernel, args.iterations)
-
-    # エッジモードでの二値化
-    if args.mode == "edge" and args.threshold > 0:
-        result = result.point(lambda p: 255 if p > args.threshold else 0)
+        arr = as_array(img)
+        if arr.ndim == 3:
+            # RGBA はアルファチャネルを保持して RGB だけ処理
+            n_channels = 3 if img.mode == "RGBA" else arr.shape[2]
+            result = from_array(_apply_color_array(
+                arr, n_channels, args.mode, args.kernel, args.iterations, args.threshold))
+        else:
+            result = from_array(
+                _apply_array(arr, args.mode, args.kernel, args.iterations, args.threshold)
+            )
 
     print(f"🔲 Applied: {args.mode} (kernel={args.kernel}, iterations={args.iterations})")
 
@@ -9,7 +9,6 @@ Example:
 """
 
 import argparse
-import os
 from pathlib import Path
 from PIL import Image
 
@@ -20,12 +19,15 @@ def main():
     args = parser.parse_args()
 
     path = Path(args.input)
-    if not path.exists():
+    # 存在確認とファイルサイズ取得を stat 1回で済ませる
+    try:
+        file_size = path.stat().st_size
+    except FileNotFoundError:
         print(f"❌ File not found: {path}")
         raise SystemExit(1)
 
+    # Image.open はヘッダしか読まない（画素はデコードしない）
     img = Image.open(path)
-    file_size = os.path.getsize(path)
 
     print(f"📄 File:       {path}")
     print(f"📐 Size:       {img.size[0]} x {img.size[1]} px")
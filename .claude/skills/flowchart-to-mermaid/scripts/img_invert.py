@@ -13,37 +13,53 @@ Examples:
     python img_invert.py chart.png --grayscale -o chart_inverted.png
 """
 
-from img_utils import base_argparser, load_image, save_image, make_output_path
+from img_utils import base_argparser, load_image, save_image, make_output_path, as_array, from_array
 from PIL import Image, ImageOps
 
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では ImageOps.invert で反転する
+    np = None
+
+# RGBA の反転マスク: RGB は全ビット反転、アルファはそのまま
+RGBA_INVERT_MASK = (0xFF, 0xFF, 0xFF, 0x00)
+
+
+def invert(img: Image.Image) -> Image.Image:
+    """L / RGB / RGBA 画像を反転する (RGBA のアルファは保持)。NumPy があれば XOR 1回で済ませる。"""
+    if np is not None:
+        if img.mode == "RGBA":
+            return from_array(as_array(img) ^ np.array(RGBA_INVERT_MASK, dtype=np.uint8))
+        if img.mode in ("L", "RGB"):
+            return from_array(as_array(img) ^ 0xFF)
+    if img.mode == "RGBA":
+        *rgb, a = img.split()
+        return Image.merge("RGBA", (*(ImageOps.invert(band) for band in rgb), a))
+    return ImageOps.invert(img)
+
 
 def main():
     parser = base_argparser("画像の色を反転する")
     parser.add_argument("--grayscale", action="store_true", help="グレースケール変換してから反転")
     args = parser.parse_args()
 
-    img = load_image(args.input)
+    # グレースケール変換（JPEG はデコード時に直接グレースケールにする）
+    img = load_image(args.input, mode="L" if args.grayscale else None)
     steps = []
-
-    # グレースケール変換
     if args.grayscale:
-        img = img.convert("L")
         steps.append("grayscale")
 
     # RGBA の場合、アルファチャネルを保持して RGB だけ反転
     if img.mode == "RGBA":
-        r, g, b, a = img.split()
-        rgb = Image.merge("RGB", (r, g, b))
-        inverted_rgb = ImageOps.invert(rgb)
-        result = Image.merge("RGBA", (*inverted_rgb.split(), a))
+        result = invert(img)
         steps.append("invert (RGB, alpha preserved)")
     elif img.mode == "P":
         # パレットモードは RGB に変換してから反転
         img = img.convert("RGB")
-        result = ImageOps.invert(img)
+        result = invert(img)
         steps.append("invert (palette→RGB)")
     else:
-        result = ImageOps.invert(img)
+        result = invert(img)
         steps.append("invert")
 
     print(f"🔄 Applied: {' → '.join(steps)}")
@@ -21,6 +21,11 @@ Examples:
 from img_utils import base_argparser, load_image, save_image, make_output_path
 from PIL import Image
 
+try:
+    import pyvips
+except ImportError:  # pyvips が無い環境では Pillow だけで縮小する
+    pyvips = None
+
 RESAMPLE_MAP = {
     "lanczos": Image.LANCZOS,
     "bilinear": Image.BILINEAR,
@@ -28,6 +33,23 @@ RESAMPLE_MAP = {
     "nearest": Image.NEAREST,
 }
 
+# pyvips のバンド数 → Pillow のモード
+VIPS_BAND_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+
+def _shrink_vips(path: str, new_w: int, new_h: int) -> Image.Image | None:
+    """pyvips の thumbnail で縮小する。全画素を展開せずストリーム処理するので大きな画像でも省メモリ。
+
+    pyvips が無い、または 8bit 以外の画像なら None を返す (呼び出し側で Pillow に任せる)。
+    """
+    if pyvips is None:
+        return None
+    thumb = pyvips.Image.thumbnail(path, new_w, height=new_h, size="force", no_rotate=True)
+    if thumb.format != "uchar" or thumb.bands not in VIPS_BAND_MODES:
+        return None
+    return Image.frombuffer(VIPS_BAND_MODES[thumb.bands], (thumb.width, thumb.height),
+                            thumb.write_to_memory(), "raw", VIPS_BAND_MODES[thumb.bands], 0, 1)
+
 
 def main():
     parser = base_argparser("画像をリサイズする")
@@ -39,8 +61,9 @@ def main():
                         help="リサンプリング方式 (default: lanczos)")
     args = parser.parse_args()
 
-    img = load_image(args.input)
-    w, h = img.size
+    # サイズ判定はヘッダだけで足りるので、画素のデコードは必要になるまで遅らせる
+    with Image.open(args.input) as probe:
+        (w, h), mode = probe.size, probe.mode
     resample = RESAMPLE_MAP[args.resample]
 
     if args.scale:
@@ -63,7 +86,15 @@ def main():
         return
 
     print(f"🔄 Resize: {w}x{h} → {new_w}x{new_h}")
-    resized = img.resize((new_w, new_h), resample)
+    resized = None
+    # 縮小 (主に --max-size) は pyvips があればそちらで行う。lanczos 以外は Pillow と結果が変わるので対象外
+    if (new_w < w and new_h < h and args.resample == "lanczos"
+            and mode in ("L", "LA", "RGB", "RGBA")):
+        resized = _shrink_vips(args.input, new_w, new_h)
+    if resized is None:
+        # 縮小なら JPEG は DCT スケーリングで目標サイズ近くまで落としてからデコードする
+        img = load_image(args.input, target_size=(new_w, new_h) if new_w < w and new_h < h else None)
+        resized = img.resize((new_w, new_h), resample)
 
     out = make_output_path(args.input, args.output, "_resized")
     save_image(resized, out)
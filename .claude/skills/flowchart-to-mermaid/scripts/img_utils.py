@@ -2,7 +2,18 @@
 
 import argparse
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では Pillow の実装を使う
+    np = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba が無い環境では Pillow の MedianFilter を使う
+    njit = None
+    prange = range
 
 
 def make_output_path(input_path: str, output_path: str | None, suffix: str = "_processed") -> Path:
@@ -13,10 +24,19 @@ def make_output_path(input_path: str, output_path: str | None, suffix: str = "_p
     return p.parent / f"{p.stem}{suffix}{p.suffix}"
 
 
-def load_image(path: str) -> Image.Image:
-    """画像を読み込んで返す。"""
+def load_image(path: str, mode: str | None = None,
+               target_size: tuple[int, int] | None = None) -> Image.Image:
+    """画像を読み込んで返す。
+
+    mode / target_size を指定すると、JPEG はその色空間・縮小率 (1/2, 1/4, 1/8) で直接デコードする
+    (draft)。target_size は下限で、実際のサイズはそれ以上になる。mode は最後に convert で保証する。
+    """
     img = Image.open(path)
+    if mode or target_size:
+        img.draft(mode or img.mode, target_size or img.size)
     img.load()  # lazy loading を強制解決
+    if mode and img.mode != mode:
+        img = img.convert(mode)
     return img
 
 
@@ -30,6 +50,147 @@ def save_image(img: Image.Image, path: Path, quality: int = 95) -> None:
     print(f"✅ Saved: {path}  ({img.size[0]}x{img.size[1]}, {img.mode})")
 
 
+def as_array(img: Image.Image) -> "np.ndarray":
+    """画素を ndarray (HxW または HxWxC, 読み取り専用) として取り出す。NumPy 処理への入口はここに揃える。"""
+    return np.asarray(img)
+
+
+def from_array(arr: "np.ndarray") -> Image.Image:
+    """ndarray を画像に戻す。L / RGBA の連続配列はコピーせずバッファを共有する。"""
+    if arr.dtype == np.uint8 and arr.flags.c_contiguous:
+        mode = "L" if arr.ndim == 2 else ("RGBA" if arr.shape[2] == 4 else None)
+        if mode:
+            return Image.frombuffer(mode, (arr.shape[1], arr.shape[0]), arr, "raw", mode, 0, 1)
+    return Image.fromarray(arr)
+
+
+def threshold_lut(threshold: int, below: int = 0, above: int = 255) -> list[int]:
+    """Image.point() 用の二値化 LUT (256 要素) を返す。threshold より大きい値が above になる。"""
+    threshold = max(-1, min(threshold, 255))
+    return [below] * (threshold + 1) + [above] * (255 - threshold)
+
+
+def _median_huang(arr, k):
+    """Huang のスライディングヒストグラム法による uint8 2D メディアンフィルタ。
+
+    境界は端のピクセルを複製して扱う (Pillow の MedianFilter と同じ)。
+    ウィンドウを1列ずらすごとに k 画素の出し入れだけでヒストグラムを更新する。
+    """
+    h, w = arr.shape
+    r = k // 2
+    half = (k * k) // 2
+    out = np.empty_like(arr)
+    for y in prange(h):
+        hist = np.zeros(256, np.int32)
+        for dy in range(-r, r + 1):
+            yy = min(max(y + dy, 0), h - 1)
+            for dx in range(-r, r + 1):
+                hist[arr[yy, min(max(dx, 0), w - 1)]] += 1
+        # m: 現在のメディアン, lt: m 未満の画素数
+        m = 0
+        lt = 0
+        while lt + hist[m] <= half:
+            lt += hist[m]
+            m += 1
+        out[y, 0] = m
+        for x in range(1, w):
+            x_out = max(x - r - 1, 0)
+            x_in = min(x + r, w - 1)
+            for dy in range(-r, r + 1):
+                yy = min(max(y + dy, 0), h - 1)
+                v = arr[yy, x_out]
+                hist[v] -= 1
+                if v < m:
+                    lt -= 1
+                v = arr[yy, x_in]
+                hist[v] += 1
+                if v < m:
+                    lt += 1
+            while lt > half:
+                m -= 1
+                lt -= hist[m]
+            while lt + hist[m] <= half:
+                lt += hist[m]
+                m += 1
+            out[y, x] = m
+    return out
+
+
+if njit is not None:
+    _median_huang = njit(parallel=True, cache=True)(_median_huang)
+
+
+def median_filter_fast(img: Image.Image, size: int = 3) -> Image.Image:
+    """メディアンフィルタ。Numba があれば JIT 版、無ければ Pillow の MedianFilter。"""
+    if np is None or njit is None or img.mode not in ("L", "RGB", "RGBA"):
+        return img.filter(ImageFilter.MedianFilter(size=size))
+    arr = as_array(img)
+    if arr.ndim == 2:
+        return from_array(_median_huang(arr, size))
+    out = np.empty_like(arr)
+    for c in range(arr.shape[2]):
+        out[..., c] = _median_huang(np.ascontiguousarray(arr[..., c]), size)
+    return from_array(out)
+
+
+def _auto_level_lut(channel: "np.ndarray", cutoff: float) -> "np.ndarray":
+    """1チャネル分の自動レベル補正 LUT を累積ヒストグラムから求める。"""
+    hist = np.bincount(channel.ravel(), minlength=256)
+    cut = int(hist.sum() * cutoff // 100)
+    # 両端から cut 画素ずつ切り捨てた後に残る最小値・最大値
+    lo = int(np.argmax(np.cumsum(hist) > cut))
+    hi = 255 - int(np.argmax(np.cumsum(hist[::-1]) > cut))
+    if hi <= lo:
+        return np.arange(256, dtype=np.uint8)
+    scale = 255.0 / (hi - lo)
+    lut = np.trunc(np.arange(256) * scale - lo * scale)
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+
+def auto_level(img: Image.Image, cutoff: float = 1) -> Image.Image:
+    """自動レベル補正 (ImageOps.autocontrast 相当)。L / RGB 画像は NumPy で処理する。"""
+    if np is None or img.mode not in ("L", "RGB"):
+        return ImageOps.autocontrast(img, cutoff=cutoff)
+    arr = as_array(img)
+    if arr.ndim == 2:
+        return from_array(_auto_level_lut(arr, cutoff)[arr])
+    out = np.empty_like(arr)
+    for c in range(arr.shape[2]):
+        out[..., c] = _auto_level_lut(arr[..., c], cutoff)[arr[..., c]]
+    return from_array(out)
+
+
+def brightness_contrast(img: Image.Image, brightness: float = 1.0, contrast: float = 1.0) -> Image.Image:
+    """明るさとコントラストを 1 回の LUT 適用でまとめて調整する。
+
+    ImageEnhance.Brightness → ImageEnhance.Contrast の順に掛けるのと同じ変換。
+    コントラストの中心 (明るさ調整後の平均輝度) はヒストグラムから求めるので、
+    中間画像もグレースケール変換も作らない (Pillow の内部丸めとは ±1 ずれることがある)。
+    """
+    if img.mode not in ("L", "RGB"):
+        if brightness != 1.0:
+            img = ImageEnhance.Brightness(img).enhance(brightness)
+        if contrast != 1.0:
+            img = ImageEnhance.Contrast(img).enhance(contrast)
+        return img
+
+    def clip(v: float) -> int:
+        return int(min(255.0, max(0.0, v)))
+
+    lut = [clip(x * brightness) for x in range(256)]
+    if contrast != 1.0:
+        # 各バンドの平均を ITU-R 601-2 の重みで合成して L 変換後の平均輝度を得る
+        hist = img.histogram()
+        weights = (1.0,) if img.mode == "L" else (0.299, 0.587, 0.114)
+        n = img.width * img.height
+        mean = int(sum(
+            w * sum(h * v for h, v in zip(hist[i * 256:(i + 1) * 256], lut)) / n
+            for i, w in enumerate(weights)
+        ) + 0.5)
+        lut = [clip(mean + contrast * (v - mean)) for v in lut]
+    return img.point(lut * len(img.getbands()))
+
+
 def base_argparser(description: str) -> argparse.ArgumentParser:
     """全スクリプト共通の引数パーサーを返す。"""
     parser = argparse.ArgumentParser(description=description)
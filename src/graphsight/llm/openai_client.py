@@ -1,5 +1,8 @@
-import base64
-from typing import List, Type, TypeVar, Tuple
+import binascii
+import functools
+import os
+import threading
+from typing import Dict, Type, TypeVar, Tuple
 from openai import OpenAI  # Sync Client
 from beautyspot import KeyGen
 from ..models import TokenUsage, spot
@@ -12,22 +15,54 @@ T = TypeVar("T")
 def ignore_self(self, *args, **kwargs):
     return KeyGen.default(args, kwargs)
 
+
+@functools.lru_cache(maxsize=32)
+def _image_data_url(image_path: str, mtime_ns: int, size: int) -> str:
+    """画像の data URL。同じ画像が何度も送られるので (パス, 更新時刻, サイズ) が同じなら読み直さない"""
+    with open(image_path, "rb") as image_file:
+        encoded_string = binascii.b2a_base64(image_file.read(), newline=False).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded_string}"
+
+
+_CLIENTS: Dict[str | None, OpenAI] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _shared_client(api_key: str | None) -> OpenAI:
+    """APIキーごとに OpenAI クライアントを共有する。インスタンスごとに接続プールを作らず、TLS接続を使い回す"""
+    key = api_key or os.environ.get("OPENAI_API_KEY")
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = OpenAI(api_key=api_key)
+        return client
+
 class OpenAIVLM(BaseVLM):
     def __init__(self, model: str = "gpt-4o", api_key: str | None = None):
-        self.client = OpenAI(api_key=api_key) # Sync Client
+        self.client = _shared_client(api_key) # Sync Client
         self._model = model
+        # モデル設定は呼び出しごとに引かず、ここで一度だけ解決する
+        self._config = get_model_config(model)
+        # リクエストの固定部分 (モデル名 + 既定パラメータから除外パラメータを除いたもの) も先に作っておく
+        self._base_params = {
+            k: v for k, v in {"model": self._config.name, **self._config.default_params}.items()
+            if k not in self._config.excluded_params
+        }
+        self._system_message = (
+            None if self._config.model_type == ModelType.REASONING
+            else {"role": "system", "content": "You are a helpful assistant specialized in diagram analysis."}
+        )
 
     @property
     def model_name(self) -> str:
         return self._model
 
     def _encode_image(self, image_path: str) -> dict:
-        with open(image_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
+        st = os.stat(image_path)
         return {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/jpeg;base64,{encoded_string}",
+                "url": _image_data_url(image_path, st.st_mtime_ns, st.st_size),
                 "detail": "high",
             }
         }
@@ -40,39 +75,23 @@ class OpenAIVLM(BaseVLM):
             output_tokens=completion.usage.completion_tokens
         )
 
-    def _prepare_messages(self, prompt: str, image_path: str | None) -> List[dict]:
+    def _make_request(self, prompt: str, image_path: str | None, response_format=None) -> dict:
         content = [{"type": "text", "text": prompt}]
         if image_path:
             content.append(self._encode_image(image_path))
-        
-        config = get_model_config(self.model_name)
-        if config.model_type == ModelType.REASONING:
-            return [{"role": "user", "content": content}]
-        else:
-            return [
-                {"role": "system", "content": "You are a helpful assistant specialized in diagram analysis."},
-                {"role": "user", "content": content}
-            ]
-
-    def _build_request_params(self, messages, response_format=None):
-        config = get_model_config(self.model_name)
-        params = {
-            "model": config.name,
-            "messages": messages,
-        }
-        for k, v in config.default_params.items():
-            params[k] = v
+
+        # 推論モデルには system メッセージを付けない
+        user_message = {"role": "user", "content": content}
+        messages = [user_message] if self._system_message is None else [self._system_message, user_message]
+
+        params = {**self._base_params, "messages": messages}
         if response_format:
             params["response_format"] = response_format
-        for excl in config.excluded_params:
-            if excl in params:
-                del params[excl]
         return params
 
     # @spot.mark(input_key_fn=ignore_self)
     def query_structured(self, prompt: str, image_path: str, response_model: Type[T]) -> Tuple[T, TokenUsage]:
-        messages = self._prepare_messages(prompt, image_path)
-        request_kwargs = self._build_request_params(messages=messages, response_format=response_model)
+        request_kwargs = self._make_request(prompt, image_path, response_format=response_model)
         
         # 同期呼び出し
         completion = self.client.beta.chat.completions.parse(**request_kwargs)
@@ -80,15 +99,14 @@ class OpenAIVLM(BaseVLM):
 
     # @spot.mark(input_key_fn=ignore_self)
     def query_text(self, prompt: str, image_path: str | None = None) -> Tuple[str, TokenUsage]:
-        messages = self._prepare_messages(prompt, image_path)
-        request_kwargs = self._build_request_params(messages=messages)
+        request_kwargs = self._make_request(prompt, image_path)
         
         # 同期呼び出し
         completion = self.client.chat.completions.create(**request_kwargs)
         return completion.choices[0].message.content, self._extract_usage(completion)
 
     def calculate_cost(self, usage: TokenUsage) -> float:
-        config = get_model_config(self.model_name)
+        config = self._config
         input_cost = (usage.input_tokens / 1_000_000) * config.input_price_per_m
         output_cost = (usage.output_tokens / 1_000_000) * config.output_price_per_m
         return input_cost + output_cost
@@ -21,7 +21,7 @@ class DiagramDetector:
             result, usage = self.vlm.query_structured(prompt, image_path, ClassificationResult)
             
             logger.info(f"✅ Type Detected: {result.diagram_type.name}")
-            logger.debug(f"   Reason: {result.reasoning}")
+            logger.debug("   Reason: {}", result.reasoning)
             
             return result.diagram_type, usage
 
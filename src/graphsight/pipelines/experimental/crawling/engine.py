@@ -7,9 +7,12 @@ Implements the "Crawl -> Initial Audit -> Consistency Loop" workflow with verbos
 
 import math
 import os
+import hashlib
+import concurrent.futures
+from collections import defaultdict, deque
 from beautyspot import Spot
 from loguru import logger
-from typing import List, Dict, Set, Optional, Tuple, NamedTuple
+from typing import Deque, List, Dict, Set, Optional, Tuple, NamedTuple
 from .strategies.base import BaseStrategy
 from .llm.base import BaseVLM
 from .models import DiagramResult, Focus, TokenUsage, StepInterpretation, ConnectedNode
@@ -28,22 +31,132 @@ class NodeRegistry:
         self.nodes: Dict[str, List[Focus]] = {}
         self.mode = mode
         self.threshold = spatial_threshold
+        # 候補ごとの (重心, グリッド集合)。Focus.is_same_location_hybrid と同じ判定を、
+        # 候補側の値を登録時に一度だけ計算して行う
+        self._locations: Dict[str, List[Tuple[Optional[Tuple[float, float]], frozenset]]] = {}
+
+    @staticmethod
+    def _location(focus: Focus) -> Tuple[Optional[Tuple[float, float]], frozenset]:
+        c = focus.centroid()
+        return (None if c == (0.0, 0.0) else c), frozenset(focus.grid_refs or ())
 
     def resolve_id(self, focus: Focus) -> str:
         base_id = focus.suggested_id if focus.suggested_id else "node_Unknown"
+        loc = self._location(focus)
         if base_id not in self.nodes:
             self.nodes[base_id] = [focus]
+            self._locations[base_id] = [loc]
             return base_id
-        candidates = self.nodes[base_id]
-        for i, candidate in enumerate(candidates):
-            if focus.is_same_location_hybrid(candidate, self.threshold):
+        c1, grids = loc
+        limit = self.threshold ** 2
+        for i, (c2, other_grids) in enumerate(self._locations[base_id]):
+            # Grid Check (OR) BBox Check
+            if (grids and not grids.isdisjoint(other_grids)) or (
+                c1 is not None and c2 is not None
+                and (c1[0] - c2[0])**2 + (c1[1] - c2[1])**2 < limit
+            ):
                 return base_id if i == 0 else f"{base_id}_{i + 1}"
         self.nodes[base_id].append(focus)
+        self._locations[base_id].append(loc)
         return f"{base_id}_{len(self.nodes[base_id])}"
 
+class StepIndex:
+    """
+    _find_matching_node 用の索引。履歴を毎回走査する代わりに、正規化済みIDを一度だけ計算して引く。
+    履歴にステップを追加したら add() で索引も更新すること。
+    """
+    def __init__(self, steps: List[StepInterpretation]):
+        self.exact: Dict[str, StepInterpretation] = {}
+        self.normalized: Dict[str, StepInterpretation] = {}
+        self.long_ids: List[Tuple[str, StepInterpretation]] = []  # 部分一致の候補 (正規化後4文字以上), 履歴順
+        for step in steps:
+            self.add(step)
+
+    @staticmethod
+    def normalize(node_id: str) -> str:
+        return node_id.lower().replace("node_", "").replace("_", " ").strip()
+
+    def add(self, step: StepInterpretation):
+        if not step.source_id: return
+        # 同じIDが複数あれば履歴で先に現れたものを優先する
+        self.exact.setdefault(step.source_id, step)
+        clean = self.normalize(step.source_id)
+        self.normalized.setdefault(clean, step)
+        if len(clean) >= 4:
+            self.long_ids.append((clean, step))
+
+class LogicGraph:
+    """
+    _find_inconsistencies 用の論理グラフ。履歴の全エッジから各ノードの in/out 集合を保持する。
+    エッジの増減は add_edge / remove_edge で差分反映し、判定が変わりうるノードを dirty に記録する。
+    """
+    def __init__(self, steps: List[StepInterpretation]):
+        self.ins: Dict[str, Set[str]] = defaultdict(set)
+        self.outs: Dict[str, Set[str]] = defaultdict(set)
+        self.positions: Dict[str, List[int]] = defaultdict(list)  # source_id -> 履歴上の位置
+        self.dirty: Set[str] = set()
+        self._counts: Dict[Tuple[str, str], int] = defaultdict(int)  # 同じ (src, dst) を持つエッジの本数
+        self._size = 0
+        for step in steps:
+            self.add_step(step)
+
+    def add_step(self, step: StepInterpretation):
+        """履歴の末尾に追加されたステップを反映する。"""
+        pos = self._size
+        self._size += 1
+        src = step.source_id
+        if not src: return
+        self.positions[src].append(pos)
+        self.dirty.add(src)
+        for edge in step.outgoing_edges:
+            self.add_edge(src, edge.target_id)
+
+    def add_edge(self, src: str, dst: str):
+        self._counts[(src, dst)] += 1
+        if self._counts[(src, dst)] == 1:
+            self.outs[src].add(dst)
+            self.ins[dst].add(src)
+        self.dirty.add(src)
+        self.dirty.add(dst)
+
+    def remove_edge(self, src: str, dst: str):
+        self._counts[(src, dst)] -= 1
+        if self._counts[(src, dst)] == 0:
+            del self._counts[(src, dst)]
+            self.outs[src].discard(dst)
+            self.ins[dst].discard(src)
+        self.dirty.add(src)
+        self.dirty.add(dst)
+
 class GraphInterpreter:
-    def __init__(self, vlm: BaseVLM):
+    def __init__(
+        self,
+        vlm: BaseVLM,
+        audit_batch_size: int = 6,
+        max_concurrency: int = 4,
+        crawl_prefetch: bool = False,
+        audit_skip_confidence: float = 0.9,
+        crawl_workers: int = 1,
+        grid_cache_dir: Optional[str] = None
+    ):
         self.vlm = vlm
+        # 監査(audit_node)を1回のVLM呼び出しにまとめるノード数
+        self.audit_batch_size = max(1, audit_batch_size)
+        # 互いに独立な監査バッチを同時に投げる数 (VLM呼び出しはI/O待ちが支配的なのでスレッドで十分)
+        self.max_concurrency = max(1, max_concurrency)
+        # BFS クロール時に次のノードの解釈を先読みする (先読み分の文脈には直前ノードの結果が含まれない)
+        self.crawl_prefetch = crawl_prefetch
+        # クロールで同時に解釈するノード数 (1 = 逐次)。並列に投げたノードの文脈には、まだ取り込まれていない他ノードの結果が含まれない
+        self.crawl_workers = max(1, crawl_workers)
+        # グリッド画像のキャッシュ先 (None = キャッシュしない。例: utils.image.GRID_CACHE_DIR)
+        self.grid_cache_dir = grid_cache_dir
+        # クロール時の自己評価がこれを超え、かつ接続数に自信があるノードは初期監査を省く
+        self.audit_skip_confidence = audit_skip_confidence
+        # 監査結果のキャッシュ: (画像ハッシュ, ノード, 提示した In/Out) -> 結果
+        # 収束ループでは変化のないノードが同じ提示で何度も再監査されるため、それをVLMに投げ直さない
+        self._audit_cache: Dict[tuple, StepInterpretation] = {}
+        self._audit_cache_size = 1024
+        self._image_key: str = ""
 
     def _format_loc(self, focus: Focus, use_grid: bool) -> str:
         if use_grid:
@@ -63,7 +176,7 @@ class GraphInterpreter:
         target_image_path = image_path
         if use_grid:
             try:
-                grid_path, r, c = add_grid_overlay(image_path, min_cell_size=150)
+                grid_path, r, c = add_grid_overlay(image_path, min_cell_size=150, cache_dir=self.grid_cache_dir)
                 target_image_path = grid_path
                 strategy.set_grid_dimensions(r, c)
 
@@ -71,6 +184,9 @@ class GraphInterpreter:
             except Exception:
                 use_grid = False
 
+        with open(target_image_path, "rb") as f:
+            self._image_key = hashlib.sha256(f.read()).hexdigest()
+
         registry = NodeRegistry(mode="grid" if use_grid else "bbox", spatial_threshold=150.0)
         total_usage = initial_usage if initial_usage else TokenUsage()
 
@@ -97,14 +213,25 @@ class GraphInterpreter:
         total_usage += usage
 
         # --- 4. Synthesis ---
-        logger.info("Phase 4: 📝 Synthesizing final graph...")
-        final_content, raw_content, synth_usage = strategy.synthesize(
-            self.vlm, target_image_path, [], step_history
-        )
-        total_usage += synth_usage
-
-        # Cleanup
-        if use_grid and target_image_path != image_path and os.path.exists(target_image_path):
+        if step_history:
+            logger.info("Phase 4: 📝 Synthesizing final graph...")
+            final_content, raw_content, synth_usage = strategy.synthesize(
+                self.vlm, target_image_path, [], step_history
+            )
+            total_usage += synth_usage
+        else:
+            # ノードが1つも見つからなければ合成する材料がないので、最も高価なVLM呼び出しを省く
+            logger.warning("Phase 4: ⚠️ No nodes were found. Skipping synthesis.")
+            final_content, raw_content = "", ""
+
+        # Cleanup (キャッシュされたグリッド画像は次回の実行で再利用するので残す)
+        if (
+            use_grid and target_image_path != image_path and os.path.exists(target_image_path)
+            and not (
+                self.grid_cache_dir
+                and os.path.abspath(os.path.dirname(target_image_path)) == os.path.abspath(self.grid_cache_dir)
+            )
+        ):
             try: os.remove(target_image_path)
             except OSError: pass
         
@@ -132,8 +259,11 @@ class GraphInterpreter:
     ) -> Tuple[List[StepInterpretation], TokenUsage]:
         
         step_history: List[StepInterpretation] = []
-        frontier_queue: List[Focus] = []
+        frontier_queue: Deque[Focus] = deque()
         visited_ids: Set[str] = set()
+        # BFS では同じIDの2回目以降のキュー投入は必ず訪問済みとして読み飛ばされるので、最初から積まない。
+        # (DFS は後から積まれた方が先に探索されるので、重複を残す)
+        queued_ids: Set[str] = set()
         usage = TokenUsage()
 
         # Initial Focus
@@ -144,44 +274,75 @@ class GraphInterpreter:
             unique_id = registry.resolve_id(focus)
             focus.suggested_id = unique_id
             frontier_queue.append(focus)
+            queued_ids.add(unique_id)
             logger.debug(f"   🚩 Start Node: {unique_id}")
 
+        # 同時に解釈するノード数。1 なら従来通りの逐次探索。
+        # 2 以上では、フロンティアから取り出したノードを並列にVLMへ投げ、結果は投げた順に取り込む。
+        # 取り込み・ID解決・キューへの追加はメインスレッドだけで行うので、registry 等にロックは要らない。
+        # 先読み (crawl_prefetch) は BFS で幅2にしたもの: 次のノードはキューの先頭で既に決まっている。
+        # (DFS は次のノードが現在ノードの結果で決まるため、先読みの対象外)
+        dfs = mode.lower() == "dfs"
+        window = self.crawl_workers
+        if self.crawl_prefetch and not dfs:
+            window = max(window, 2)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=window) if window > 1 else None
+        inflight: Deque[Tuple[Focus, Optional[concurrent.futures.Future]]] = deque()
+
         step_count = 0
-        while frontier_queue and step_count < 30:
-            if mode.lower() == "dfs":
-                current = frontier_queue.pop(-1)
-            else:
-                current = frontier_queue.pop(0)
-            
-            if current.suggested_id in visited_ids: continue
-            visited_ids.add(current.suggested_id)
+        try:
+            while frontier_queue or inflight:
+                # 空きがあるだけフロンティアから取り出して投げる
+                while frontier_queue and len(inflight) < window and step_count < 30:
+                    current = frontier_queue.pop() if dfs else frontier_queue.popleft()
+                    
+                    if current.suggested_id in visited_ids: continue
+                    visited_ids.add(current.suggested_id)
+                    step_count += 1
 
-            logger.info(f"   📍 Exploring: {current.suggested_id}")
-            
-            context = list(step_history)
-            result, u = strategy.interpret_step(self.vlm, image_path, current, context)
-            usage += u
-
-            result.source_id = current.suggested_id
-            result.source_grid_refs = current.grid_refs
-            result.source_bbox = current.bbox
-            step_history.append(result)
-
-            # Queue Next
-            for edge in result.outgoing_edges:
-                next_focus = Focus(
-                    description=edge.description,
-                    bbox=edge.bbox,
-                    grid_refs=edge.grid_refs,
-                    suggested_id=edge.target_id
-                )
-                resolved_id = registry.resolve_id(next_focus)
-                next_focus.suggested_id = resolved_id
-                edge.target_id = resolved_id
+                    logger.info(f"   📍 Exploring: {current.suggested_id}")
+
+                    if executor is None:
+                        inflight.append((current, None))
+                    else:
+                        # 別スレッドで読まれている間も履歴は伸びるので、スナップショットを渡す
+                        inflight.append((current, executor.submit(
+                            strategy.interpret_step, self.vlm, image_path, current, list(step_history)
+                        )))
+                if not inflight:
+                    break
+
+                current, future = inflight.popleft()
+                if future is None:
+                    # strategy は履歴を読むだけ (書き換えない) なので、コピーせずにそのまま渡す
+                    result, u = strategy.interpret_step(self.vlm, image_path, current, step_history)
+                else:
+                    result, u = future.result()
+                usage += u
+
+                result.source_id = current.suggested_id
+                result.source_grid_refs = current.grid_refs
+                result.source_bbox = current.bbox
+                step_history.append(result)
+
+                # Queue Next
+                for edge in result.outgoing_edges:
+                    next_focus = Focus(
+                        description=edge.description,
+                        bbox=edge.bbox,
+                        grid_refs=edge.grid_refs,
+                        suggested_id=edge.target_id
+                    )
+                    resolved_id = registry.resolve_id(next_focus)
+                    next_focus.suggested_id = resolved_id
+                    edge.target_id = resolved_id
                 
-                if resolved_id not in visited_ids:
-                    frontier_queue.append(next_focus)
-            step_count += 1
+                    if resolved_id not in visited_ids and (dfs or resolved_id not in queued_ids):
+                        frontier_queue.append(next_focus)
+                        queued_ids.add(resolved_id)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
             
         return step_history, usage
 
@@ -199,27 +360,27 @@ class GraphInterpreter:
         """
         total_usage = TokenUsage()
 
-        for step in step_history:
-            node_id = step.source_id
-            proposed_out = [e.target_id for e in step.outgoing_edges]
-            
-            reconstruct_focus = Focus(
-                description=step.visual_observation or "Audit target",
-                suggested_id=node_id,
-                bbox=step.source_bbox,
-                grid_refs=step.source_grid_refs
-            )
+        # クロール時に高い確信度で全接続を追えたノードは監査しない (整合性ループでの検査対象には残る)
+        targets = [
+            step for step in step_history
+            if not (step.edge_count_confident and step.confidence > self.audit_skip_confidence)
+        ]
+        if len(targets) < len(step_history):
+            logger.info(f"   ⏭️ Skipping initial audit for {len(step_history) - len(targets)} confident node(s)")
+
+        # 監査実行 (Incomingは空)。各ノードの監査は互いの結果に依存しないのでバッチにまとめて並列に投げる
+        audit_results, u = self._audit_all(
+            image_path,
+            strategy,
+            step_history,
+            [self._reconstruct_focus(step, "Audit target") for step in targets],
+            [[] for _ in targets],
+            [[e.target_id for e in step.outgoing_edges] for step in targets]
+        )
+        total_usage += u
 
-            # 監査実行 (Incomingは空)
-            audit_result, u = strategy.audit_node(
-                self.vlm,
-                image_path,
-                reconstruct_focus,
-                step_history,
-                [], 
-                proposed_out
-            )
-            total_usage += u
+        for step, audit_result in zip(targets, audit_results):
+            node_id = step.source_id
 
             # 結果反映
             if audit_result.audit_confirmed_outgoing is not None:
@@ -257,12 +418,16 @@ class GraphInterpreter:
         不整合チェック -> 修正(Audit) -> 履歴書き換え -> 繰り返し
         """
         total_usage = TokenUsage()
+        # ループ中に履歴は追加されるだけ (IDの変更・削除なし) なので、索引は一度作って使い回す
+        index = StepIndex(step_history)
+        # 論理グラフも毎回作り直さず、修正で変化した部分だけ差分更新する
+        graph = LogicGraph(step_history)
 
         for attempt in range(max_attempts):
             logger.info(f"🔄 Consistency Iteration {attempt + 1}/{max_attempts}")
 
             # 1. Check
-            tasks = self._find_inconsistencies(step_history)
+            tasks = self._find_inconsistencies(step_history, graph)
 
             if not tasks:
                 logger.info("✅ Graph Converged! No inconsistencies found.")
@@ -272,7 +437,7 @@ class GraphInterpreter:
 
             # 2. Fix
             changes_made, u = self._execute_fix_batch(
-                image_path, strategy, step_history, tasks
+                image_path, strategy, step_history, tasks, index, graph
             )
             total_usage += u
 
@@ -282,29 +447,23 @@ class GraphInterpreter:
         
         return total_usage
 
-    def _find_inconsistencies(self, step_history: List[StepInterpretation]) -> List[AuditTask]:
+    def _find_inconsistencies(self, step_history: List[StepInterpretation], graph: Optional[LogicGraph] = None) -> List[AuditTask]:
         # A. Logic Graph Construction
-        graph_map = {} 
-        for step in step_history:
-            if step.source_id: graph_map[step.source_id] = {"in": set(), "out": set()}
-        
-        for step in step_history:
-            src = step.source_id
-            if not src: continue
-            for edge in step.outgoing_edges:
-                dst = edge.target_id
-                graph_map[src]["out"].add(dst)
-                if dst not in graph_map: graph_map[dst] = {"in": set(), "out": set()}
-                graph_map[dst]["in"].add(src)
+        # 差分更新済みのグラフが渡された場合は、前回のチェック以降に変化しうるノード (dirty) だけを見直す。
+        # 前回不整合だったノードは全て監査済み = dirty なので、それ以外は整合したままである。
+        if graph is None:
+            graph = LogicGraph(step_history)
+        positions = sorted(i for node_id in graph.dirty for i in graph.positions.get(node_id, ()))
+        graph.dirty.clear()
 
         # B. Compare
         tasks = []
-        for i, step in enumerate(step_history):
+        for i in positions:
+            step = step_history[i]
             node_id = step.source_id
-            if not node_id: continue
 
-            logic_in = graph_map.get(node_id, {}).get("in", set())
-            logic_out = graph_map.get(node_id, {}).get("out", set())
+            logic_in = graph.ins.get(node_id, set())
+            logic_out = graph.outs.get(node_id, set())
             reasons = []
 
             # Check Incoming
@@ -318,9 +477,13 @@ class GraphInterpreter:
                     reasons.append(f"Incoming Logic({len(logic_in)}) != VisualCount({visual_count})")
 
             # Check Outgoing
-            current_out = set([e.target_id for e in step.outgoing_edges])
-            if logic_out != current_out:
-                reasons.append("Outgoing Sync Error")
+            # Incoming で既に再監査が決まっていれば、監査が Outgoing も確認し直すので比較は省く。
+            # logic_out は同じIDを持つ全ステップの接続先の和集合。IDが1つのステップにしか無ければ
+            # (LogicGraph がエッジの増減に同期しているので) そのステップの接続先集合と常に一致する
+            if not reasons and len(graph.positions[node_id]) > 1:
+                current_out = {e.target_id for e in step.outgoing_edges}
+                if logic_out != current_out:
+                    reasons.append("Outgoing Sync Error")
 
             if reasons:
                 tasks.append(AuditTask(
@@ -333,7 +496,9 @@ class GraphInterpreter:
         image_path: str,
         strategy: BaseStrategy,
         step_history: List[StepInterpretation],
-        tasks: List[AuditTask]
+        tasks: List[AuditTask],
+        index: Optional[StepIndex] = None,
+        graph: Optional[LogicGraph] = None
     ) -> Tuple[bool, TokenUsage]:
         """
         監査タスクを実行し、Forward Patching（自分の出力修正）と
@@ -342,32 +507,34 @@ class GraphInterpreter:
         total_usage = TokenUsage()
         changes = False
         
-        # ※ ID検索用マップは動的にノードが増えるため、ここでは作らず
-        #    都度 _find_matching_node で検索する戦略をとる。
-
+        # ID検索用の索引。動的にノードが増えるので、追加のたびに index.add で更新する
+        if index is None:
+            index = StepIndex(step_history)
+        # 論理グラフにも履歴の書き換えを差分で反映する
+        if graph is None:
+            graph = LogicGraph(step_history)
+        # Reverse Patching の接続済み判定用: id(step) -> outgoing の接続先集合 (必要になった時点で作る)
+        out_targets: Dict[int, Set[str]] = {}
+
+        # 1. 再監査 (Re-Audit)
+        # 提示する In/Out は _find_inconsistencies の時点で確定しているので、監査はバッチでまとめて先に行い、
+        # 履歴を書き換えるパッチ処理だけを従来通りタスク順に適用する。
         for task in tasks:
+            logger.info(f"   ⚖️ Re-Auditing '{task.step.source_id}': {task.reasons}")
+        audit_results, u = self._audit_all(
+            image_path,
+            strategy,
+            step_history,
+            [self._reconstruct_focus(task.step, "Audit") for task in tasks],
+            [task.proposed_in for task in tasks],
+            [task.proposed_out for task in tasks]
+        )
+        total_usage += u
+
+        for task, audit_result in zip(tasks, audit_results):
             step = task.step
             node_id = step.source_id
-            
-            reconstruct_focus = Focus(
-                description=step.visual_observation or "Audit",
-                suggested_id=node_id,
-                bbox=step.source_bbox,
-                grid_refs=step.source_grid_refs
-            )
-
-            logger.info(f"   ⚖️ Re-Auditing '{node_id}': {task.reasons}")
-            
-            # 1. 再監査 (Re-Audit)
-            audit_result, u = strategy.audit_node(
-                self.vlm,
-                image_path,
-                reconstruct_focus,
-                step_history,
-                task.proposed_in,
-                task.proposed_out
-            )
-            total_usage += u
+            graph.dirty.add(node_id)  # 監査メタデータが更新されるので判定し直す
 
             # 2. Metadata Update Detection
             prev_in = step.audit_confirmed_incoming
@@ -400,6 +567,7 @@ class GraphInterpreter:
                         confirmed.remove(edge.target_id)
                     else:
                         logger.info(f"      ✂️ Removing edge: {node_id} --> {edge.target_id}")
+                        graph.remove_edge(node_id, edge.target_id)
                         changes = True # 削除発生
                 
                 # 新規エッジの追加
@@ -410,9 +578,11 @@ class GraphInterpreter:
                         description="(Fix Added)",
                         edge_label=None
                     ))
+                    graph.add_edge(node_id, new_tgt)
                     changes = True # 追加発生
                 
                 step.outgoing_edges = new_edges
+                out_targets.pop(id(step), None)
 
             # 4. Reverse Patching (相手のOutgoingを強制修正 & 新規作成)
             # 「私(B)へのIncomingはAだ」と確定したら、AのOutgoingにBを強制追加する
@@ -420,20 +590,24 @@ class GraphInterpreter:
                 for src_id_raw in audit_result.audit_confirmed_incoming:
                     
                     # A. 既存ノードから検索 (Fuzzy Match)
-                    matched_step = self._find_matching_node(src_id_raw, step_history)
+                    matched_step = self._find_matching_node(src_id_raw, index)
                     
                     if matched_step:
                         # 既存ノードが見つかった場合 -> 接続を追加
                         src_id = matched_step.source_id
-                        already_connected = any(e.target_id == node_id for e in matched_step.outgoing_edges)
+                        targets = out_targets.get(id(matched_step))
+                        if targets is None:
+                            targets = out_targets[id(matched_step)] = {e.target_id for e in matched_step.outgoing_edges}
                         
-                        if not already_connected:
+                        if node_id not in targets:
                             logger.info(f"      🔗 [Reverse Patch] Forcing {src_id} --> {node_id} (Matched from '{src_id_raw}')")
                             matched_step.outgoing_edges.append(ConnectedNode(
                                 target_id=node_id,
                                 description="(Reverse Patched)",
                                 edge_label=None
                             ))
+                            targets.add(node_id)
+                            graph.add_edge(src_id, node_id)
                             # Cache update (相手のAudit結果も更新して整合性を保つ)
                             if matched_step.audit_confirmed_outgoing is not None:
                                 if node_id not in matched_step.audit_confirmed_outgoing:
@@ -459,40 +633,109 @@ class GraphInterpreter:
                         )
                         
                         step_history.append(new_step)
+                        index.add(new_step)
+                        graph.add_step(new_step)
                         changes = True
 
         return changes, total_usage
 
-    def _find_matching_node(self, target_id: str, history: List[StepInterpretation]) -> Optional[StepInterpretation]:
+    def _audit_all(
+        self,
+        image_path: str,
+        strategy: BaseStrategy,
+        step_history: List[StepInterpretation],
+        focuses: List[Focus],
+        proposed_ins: List[List[str]],
+        proposed_outs: List[List[str]]
+    ) -> Tuple[List[StepInterpretation], TokenUsage]:
+        """
+        focuses を audit_batch_size ごとのバッチに分け、バッチ単位で並列に監査する。
+        結果は focuses と同じ順序で返す。監査は履歴を読むだけなので、書き換えは呼び出し側で順に行うこと。
+        """
+        keys = [
+            (
+                self._image_key, f.suggested_id, f.description, tuple(f.bbox or ()), tuple(f.grid_refs or ()),
+                tuple(sorted(pin)), tuple(sorted(pout))
+            )
+            for f, pin, pout in zip(focuses, proposed_ins, proposed_outs)
+        ]
+        found = {k: self._audit_cache[k] for k in keys if k in self._audit_cache}
+        # キャッシュに無いものだけ監査する (同じ呼び出し内の重複も1回にまとめる)
+        misses = []
+        for i, k in enumerate(keys):
+            if k not in found:
+                found[k] = None
+                misses.append(i)
+        if len(misses) < len(keys):
+            logger.debug(f"      💾 Audit cache hit: {len(keys) - len(misses)}/{len(keys)}")
+
+        size = self.audit_batch_size
+        batches = [
+            (
+                [focuses[i] for i in idx],
+                [proposed_ins[i] for i in idx],
+                [proposed_outs[i] for i in idx]
+            )
+            for idx in (misses[j:j + size] for j in range(0, len(misses), size))
+        ]
+
+        def _run(batch):
+            f, pin, pout = batch
+            return strategy.audit_nodes_batch(self.vlm, image_path, f, step_history, pin, pout)
+
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            outcomes = [_run(b) for b in batches]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as ex:
+                outcomes = list(ex.map(_run, batches))
+
+        total_usage = TokenUsage()
+        fresh = []
+        for batch_results, u in outcomes:
+            fresh.extend(batch_results)
+            total_usage += u
+        for i, result in zip(misses, fresh):
+            found[keys[i]] = result
+            if len(self._audit_cache) >= self._audit_cache_size:
+                self._audit_cache.pop(next(iter(self._audit_cache)))
+            self._audit_cache[keys[i]] = result
+
+        # 呼び出し側が結果のリストを書き換えるので、キャッシュ本体ではなくコピーを返す
+        results = [found[k].model_copy(deep=True) for k in keys]
+        return results, total_usage
+
+    def _reconstruct_focus(self, step: StepInterpretation, default_description: str) -> Focus:
+        """履歴のステップから監査用の Focus を復元する。"""
+        return Focus(
+            description=step.visual_observation or default_description,
+            suggested_id=step.source_id,
+            bbox=step.source_bbox,
+            grid_refs=step.source_grid_refs
+        )
+
+    def _find_matching_node(self, target_id: str, index: StepIndex) -> Optional[StepInterpretation]:
         """
         IDの表記ゆれを吸収して、履歴から該当するノードを探すヘルパーメソッド。
         """
         if not target_id: return None
-        target_clean = target_id.lower().replace("node_", "").replace("_", " ").strip()
+        target_clean = StepIndex.normalize(target_id)
         
         # 1. 完全一致 (Exact)
-        for step in history:
-            if step.source_id == target_id:
-                return step
+        step = index.exact.get(target_id)
+        if step is not None:
+            return step
         
         # 2. 正規化一致 (Normalized)
-        for step in history:
-            if not step.source_id: continue
-            src_clean = step.source_id.lower().replace("node_", "").replace("_", " ").strip()
-            if src_clean == target_clean:
-                return step
+        step = index.normalized.get(target_clean)
+        if step is not None:
+            return step
                 
         # 3. 部分一致 (Substring) - 慎重に適用
         # 短すぎるIDでの誤爆を防ぐため、ある程度の長さがある場合のみ許可
         if len(target_clean) >= 4:
-            for step in history:
-                if not step.source_id: continue
-                src_clean = step.source_id.lower().replace("node_", "").replace("_", " ").strip()
-                
+            for src_clean, step in index.long_ids:
                 # 双方向の部分一致 ("Is there opportunity" in "node_Is_there_an_opportunity")
-                if len(src_clean) >= 4:
-                    if target_clean in src_clean or src_clean in target_clean:
-                        return step
+                if target_clean in src_clean or src_clean in target_clean:
+                    return step
                     
         return None
-
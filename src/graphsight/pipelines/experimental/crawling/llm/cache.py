@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Type, TypeVar
+from ..models import TokenUsage
+from .base import BaseVLM
+
+T = TypeVar("T")
+
+
+def _lru_put(cache: OrderedDict, key, value, maxsize: int):
+    """cache に追加し、maxsize を超えた分を古い順に捨てる (呼び出し側でロックを取ること)"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+class CachedVLM(BaseVLM):
+    """
+    VLM呼び出しを (画像の内容ハッシュ, プロンプト, 応答モデル) で記憶するラッパー。
+    収束ループでは同じ領域・同じ提示での問い合わせが繰り返されるため、2回目以降はVLMに投げずに返す。
+    切り出し画像は毎回別の一時ファイルになるので、パスではなく内容でキーを作る。
+
+    使い方: GraphInterpreter(CachedVLM(OpenAIVLM()))
+    """
+    def __init__(self, vlm: BaseVLM, maxsize: int = 512):
+        self.vlm = vlm
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[tuple, object]" = OrderedDict()
+        # (path, mtime, size) -> sha256。一時ファイルのパスは毎回変わるので、これも maxsize で打ち切る
+        self._digests: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()  # 監査はスレッドから並列に呼ばれる
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.vlm.model_name
+
+    def calculate_cost(self, usage: TokenUsage) -> float:
+        return self.vlm.calculate_cost(usage)
+
+    def _image_digest(self, image_path: Optional[str]) -> Optional[str]:
+        if not image_path:
+            return None
+        st = os.stat(image_path)
+        stat_key = (image_path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+            if digest is not None:
+                self._digests.move_to_end(stat_key)
+                return digest
+        # ハッシュ計算 (ファイル読み込み) はロックの外で行う
+        with open(image_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with self._lock:
+            _lru_put(self._digests, stat_key, digest, self.maxsize)
+        return digest
+
+    def _lookup(self, key: tuple):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key: tuple, value):
+        with self._lock:
+            _lru_put(self._cache, key, value, self.maxsize)
+
+    def query_structured(self, prompt: str, image_path: str, response_model: Type[T]) -> Tuple[T, TokenUsage]:
+        key = (self._image_digest(image_path), prompt, response_model)
+        cached = self._lookup(key)
+        if cached is not None:
+            # 呼び出し側が結果を書き換えるのでコピーを返す。キャッシュ命中分はトークンを消費しない
+            return cached.model_copy(deep=True), TokenUsage()
+
+        result, usage = self.vlm.query_structured(prompt, image_path, response_model)
+        self._store(key, result.model_copy(deep=True))
+        return result, usage
+
+    def query_text(self, prompt: str, image_path: str | None = None) -> Tuple[str, TokenUsage]:
+        key = (self._image_digest(image_path), prompt, str)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached, TokenUsage()
+
+        text, usage = self.vlm.query_text(prompt, image_path)
+        self._store(key, text)
+        return text, usage
@@ -60,11 +60,15 @@ MODEL_REGISTRY = {
     ),
 }
 
+_warned_models: Set[str] = set()  # フォールバックを通知済みのモデル名 (同じ通知を繰り返さない)
+
 def get_model_config(model_name: str) -> ModelConfig:
     if model_name in MODEL_REGISTRY:
         # logger.info(f"Got model config of {model_name} successfully")
         return MODEL_REGISTRY[model_name]
     # エイリアス解決などが必要ならここに追加
-    logger.info(f"{model_name} DOES NOT EXIST in MODEL_REGISTRY. Use gpt-4o as default.")
+    if model_name not in _warned_models:
+        _warned_models.add(model_name)
+        logger.info(f"{model_name} DOES NOT EXIST in MODEL_REGISTRY. Use gpt-4o as default.")
     return MODEL_REGISTRY["gpt-4o"]
 
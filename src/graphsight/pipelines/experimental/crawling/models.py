@@ -162,6 +162,10 @@ class StepInterpretation(BaseModel):
 
     is_done: bool = Field(False)
 
+    # --- Self-assessment (初期監査のスキップ判定用) ---
+    confidence: float = Field(0.0, description="Confidence (0.0-1.0) that the outgoing connections above are complete and correct.")
+    edge_count_confident: bool = Field(False, description="True ONLY if every arrow leaving this node was clearly traced to its target (no ambiguous or occluded lines).")
+
     # --- Context Meta (Engine injected) ---
     source_id: Optional[str] = Field(None, description="The ID of the node analyzed.")
     source_grid_refs: Optional[List[str]] = Field(None)
@@ -195,3 +199,24 @@ class ConnectionVerificationResult(BaseModel):
     is_connected: bool = Field(..., description="True only if a visible line connects the two nodes.")
     reason: str = Field(..., description="Why is it connected or not? (e.g. 'Line fades out', 'Clear arrow seen')")
 
+
+@spot.register(
+    code=10,
+    encoder=lambda x: x.model_dump_json().encode(),
+    decoder=lambda x: NodeAudit.model_validate_json(x),
+)
+class NodeAudit(BaseModel):
+    """Audit verdict for one node of a batched audit (matched back by `index`)."""
+    index: int = Field(..., description="The [index] of the target node this verdict belongs to.")
+    audit_confirmed_incoming: Optional[List[str]] = Field(None, description="List of source_ids CONFIRMED by global audit.")
+    audit_confirmed_outgoing: Optional[List[str]] = Field(None, description="List of target_ids CONFIRMED by global audit.")
+    audit_notes: Optional[str] = Field(None, description="Notes from the audit (e.g. 'Removed phantom edge from A').")
+
+
+@spot.register(
+    code=11,
+    encoder=lambda x: x.model_dump_json().encode(),
+    decoder=lambda x: BatchAuditResult.model_validate_json(x),
+)
+class BatchAuditResult(BaseModel):
+    audits: List[NodeAudit] = Field(..., description="One verdict per target node, in any order.")
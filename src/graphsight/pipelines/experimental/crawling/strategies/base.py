@@ -73,6 +73,28 @@ class BaseStrategy(ABC):
         # デフォルトはスルー（何もしない）だが、FlowchartStrategyで実装する
         return self.interpret_step(vlm, image_path, current_focus, context_history)
 
+    def audit_nodes_batch(
+        self,
+        vlm: BaseVLM,
+        image_path: str,
+        focuses: List[Focus],
+        context_history: List[StepInterpretation],
+        proposed_incomings: List[List[str]],
+        proposed_outgoings: List[List[str]]
+    ) -> Tuple[List[StepInterpretation], TokenUsage]:
+        """
+        Batched Global Integrity Check:
+        複数ノードの audit_node をまとめて実行し、focuses と同じ順序で結果を返す。
+        デフォルトは1ノードずつ audit_node を呼ぶだけ。1回の問い合わせにまとめられる戦略はオーバーライドする。
+        """
+        results = []
+        total_usage = TokenUsage()
+        for focus, proposed_in, proposed_out in zip(focuses, proposed_incomings, proposed_outgoings):
+            result, u = self.audit_node(vlm, image_path, focus, context_history, proposed_in, proposed_out)
+            results.append(result)
+            total_usage += u
+        return results, total_usage
+
     @abstractmethod
     def synthesize(
         self, 
@@ -11,9 +11,8 @@ from loguru import logger
 from .base import BaseStrategy, OutputFormat
 from ..llm.base import BaseVLM
 from ..llm.config import get_model_config, ModelType
-from ..models import Focus, StepInterpretation, TokenUsage, InitialFocusList, ConnectionVerificationResult
-from ..utils.geometry import calculate_relative_direction
-from ..utils.image import crop_connection_area, crop_grid_area
+from ..models import Focus, StepInterpretation, TokenUsage, InitialFocusList, ConnectionVerificationResult, BatchAuditResult
+from ..utils.image import crop_connection_area
 
 if 'InitialFocusList' not in globals():
     class InitialFocusList(BaseModel):
@@ -174,7 +173,17 @@ class FlowchartStrategy(BaseStrategy):
         total_usage = TokenUsage()
         
         # --- Stage 1: Macro Audit (全体画像での監査) ---
+        macro_prompt = self._build_macro_audit_prompt(current_focus, proposed_incoming, proposed_outgoing)
+        base_audit, u = vlm.query_structured(macro_prompt, image_path, StepInterpretation)
+        total_usage += u
+        
+        # --- Stage 2: Micro Verification (クロップ検証) ---
+        base_audit, u = self._micro_verify(vlm, image_path, current_focus, context_history, base_audit)
+        total_usage += u
         
+        return base_audit, total_usage
+
+    def _build_macro_audit_prompt(self, current_focus: Focus, proposed_incoming: List[str], proposed_outgoing: List[str]) -> str:
         loc_str = f"Location: Grid={current_focus.grid_refs}" if self.use_grid else f"Location: BBox={current_focus.bbox}"
         in_str = ", ".join(sorted(proposed_incoming)) if proposed_incoming else "(None)"
         out_str = ", ".join(sorted(proposed_outgoing)) if proposed_outgoing else "(None)"
@@ -208,11 +217,17 @@ class FlowchartStrategy(BaseStrategy):
         # Output Requirement
         Return a `StepInterpretation` with `audit_confirmed_incoming`, `audit_confirmed_outgoing`, and `audit_notes`.
         """
-        
-        base_audit, u = vlm.query_structured(macro_prompt, image_path, StepInterpretation)
-        total_usage += u
-        
-        # --- Stage 2: Micro Verification (クロップ検証) ---
+        return macro_prompt
+
+    def _micro_verify(
+        self,
+        vlm: BaseVLM,
+        image_path: str,
+        current_focus: Focus,
+        context_history: List[StepInterpretation],
+        base_audit: StepInterpretation
+    ) -> Tuple[StepInterpretation, TokenUsage]:
+        total_usage = TokenUsage()
         # "Outgoing" として確定しかけたリストに対し、本当に繋がっているか「虫眼鏡」で確認する。
         # (Incomingの検証は、相手側のOutgoing検証で行われるため、ここではOutgoingに集中する)
         
@@ -241,37 +256,12 @@ class FlowchartStrategy(BaseStrategy):
                 final_outgoing_confirmed.append(target_id)
                 continue
 
-            crop_path = None
-
-            if self.use_grid and self.grid_rows > 0:
-                # === GRID BASED CROP ===
-                # 両者の grid_refs を使用
-                src_refs = current_focus.grid_refs or []
-                tgt_refs = target_step.source_grid_refs or []
-                
-                if src_refs or tgt_refs:
-                    crop_path = crop_grid_area(
-                        image_path, 
-                        src_refs, 
-                        tgt_refs, 
-                        self.grid_rows, 
-                        self.grid_cols
-                    )
-            
-            # Gridで失敗した、またはGridモードでない場合はBBoxを使用
-            if not crop_path and current_focus.bbox and target_step and target_step.source_bbox:
-                # === BBOX BASED CROP ===
-                crop_path = crop_connection_area(image_path, current_focus.bbox, target_step.source_bbox)
-            
-            if not crop_path:
-                final_outgoing_confirmed.append(target_id)
-                continue
             # ターゲットの位置情報がない場合は、クロップできないのでMacro判定を信じる
-            if not target_step or not target_step.source_bbox:
+            if not target_step.source_bbox:
                 final_outgoing_confirmed.append(target_id)
                 continue
             
-            # クロップ画像の生成
+            # クロップ画像の生成 (ノード対ごとに1回だけ切り出す)
             crop_path = crop_connection_area(image_path, current_focus.bbox, target_step.source_bbox)
             
             micro_prompt = f"""
@@ -313,8 +303,8 @@ class FlowchartStrategy(BaseStrategy):
                 # エラー時は安全側に倒して（あるいは元の判定を信じて）残す
                 final_outgoing_confirmed.append(target_id)
             finally:
-                # 一時ファイルの削除
-                if os.path.exists(crop_path):
+                # 一時ファイルの削除 (クロップ失敗時は元画像のパスが返るので消さない)
+                if crop_path != image_path and os.path.exists(crop_path):
                     os.remove(crop_path)
         
         # 最終結果の上書き
@@ -322,6 +312,91 @@ class FlowchartStrategy(BaseStrategy):
         
         return base_audit, total_usage
 
+    def audit_nodes_batch(
+        self,
+        vlm: BaseVLM,
+        image_path: str,
+        focuses: List[Focus],
+        context_history: List[StepInterpretation],
+        proposed_incomings: List[List[str]],
+        proposed_outgoings: List[List[str]]
+    ) -> Tuple[List[StepInterpretation], TokenUsage]:
+        """
+        Batched Two-Stage Verification:
+        Stage 1 (Macro Audit) を複数ノード分まとめて1回のVLM呼び出しで行う（画像の送信も1回）。
+        Stage 2 (Micro Verification) はノードごとのクロップ画像を使うため従来通り個別に行う。
+        """
+        if len(focuses) <= 1:
+            return super().audit_nodes_batch(vlm, image_path, focuses, context_history, proposed_incomings, proposed_outgoings)
+
+        total_usage = TokenUsage()
+        
+        # --- Stage 1: Batched Macro Audit ---
+        macro_prompt = self._build_batch_macro_audit_prompt(focuses, proposed_incomings, proposed_outgoings)
+        batch, u = vlm.query_structured(macro_prompt, image_path, BatchAuditResult)
+        total_usage += u
+        by_index = {a.index: a for a in batch.audits}
+
+        results = []
+        for i, (focus, proposed_in, proposed_out) in enumerate(zip(focuses, proposed_incomings, proposed_outgoings)):
+            audit = by_index.get(i)
+            if audit is None:
+                # 回答が欠けたノードは単体で監査し直す
+                logger.warning(f"      ⚠️ Batch audit returned no verdict for '{focus.suggested_id}'. Auditing it alone.")
+                result, u = self.audit_node(vlm, image_path, focus, context_history, proposed_in, proposed_out)
+            else:
+                base_audit = StepInterpretation(
+                    outgoing_edges=[],
+                    audit_confirmed_incoming=audit.audit_confirmed_incoming,
+                    audit_confirmed_outgoing=audit.audit_confirmed_outgoing,
+                    audit_notes=audit.audit_notes
+                )
+                # --- Stage 2: Micro Verification (クロップ検証) ---
+                result, u = self._micro_verify(vlm, image_path, focus, context_history, base_audit)
+            total_usage += u
+            results.append(result)
+
+        return results, total_usage
+
+    def _build_batch_macro_audit_prompt(self, focuses: List[Focus], proposed_incomings: List[List[str]], proposed_outgoings: List[List[str]]) -> str:
+        targets = []
+        for i, (focus, proposed_in, proposed_out) in enumerate(zip(focuses, proposed_incomings, proposed_outgoings)):
+            loc_str = f"Location: Grid={focus.grid_refs}" if self.use_grid else f"Location: BBox={focus.bbox}"
+            in_str = ", ".join(sorted(proposed_in)) if proposed_in else "(None)"
+            out_str = ", ".join(sorted(proposed_out)) if proposed_out else "(None)"
+            targets.append(f"""
+        ## [{i}] "{focus.suggested_id}"
+        - {loc_str}
+        - Description: "{focus.description}"
+        - Claimed Incoming: [{in_str}]
+        - Claimed Outgoing: [{out_str}]""")
+        target_str = "\n".join(targets)
+
+        return f"""
+        You are a **Forensic Graph Auditor**.
+        Your goal is to detect and remove "Phantom Connections" (Hallucinations) and find missed "Long-distance Connections".
+        Audit EACH of the {len(focuses)} target nodes below independently.
+        
+        # Target Nodes with HYPOTHESIS (Current Data)
+        {target_str}
+        
+        # TASK: Visual Verification on Full Image (for every target)
+        1. **Verify Incoming**:
+           - **Action**: REMOVE if no visible line connects.
+           - **Action**: ADD if you see a clear arrow from an unlisted node.
+        
+        2. **Verify Outgoing**:
+           - **Action**: REMOVE if the line fades out, crosses over, or stops short.
+           - **Action**: ADD if you trace a line to a valid target (even if far away).
+           
+        3. **Critical Rules**:
+           - **Ignore Proximity**: Two nodes being close does NOT mean they connect. Look for the LINE.
+           - **Trace Carefully**: Follow lines through crosses and turns.
+        
+        # Output Requirement
+        Return `audits`: one entry per target with its `index` (the number in [brackets]), `audit_confirmed_incoming`, `audit_confirmed_outgoing`, and `audit_notes`.
+        """
+
     def _build_reasoning_prompt(self, current_focus: Focus, history_text: str, loc_str: str, rules: str, context_note: str) -> str:
         return f"""
         Analyze the flowchart.
@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import math
 import string
 import os
@@ -20,11 +21,34 @@ def encode_image_to_base64(image_path: str) -> str:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
 
-def add_grid_overlay(image_path: str, min_cell_size: int = 150) -> Tuple[str, int, int]:
+# グリッド画像のキャッシュ先の推奨値 (add_grid_overlay の cache_dir に渡すと有効になる)。
+# 同じ画像への再実行ではオーバーレイを作り直さない。エントリは自動では削除されない
+GRID_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "graphsight", "grids"
+)
+
+
+def add_grid_overlay(image_path: str, min_cell_size: int = 150, cache_dir: str | None = None) -> Tuple[str, int, int]:
     """
     画像にグリッドを焼き込む。
     【改善版】実線によるノイズを避けるため、交点マーカー(+)とラベルのみを描画する。
+    cache_dir があれば (画像の内容, セルサイズ) をキーに生成済みの画像を再利用する。None なら元画像の隣に出力する。
     """
+    output_path = f"{os.path.splitext(image_path)[0]}.grid.png"
+    if cache_dir:
+        with open(image_path, "rb") as f:
+            key = hashlib.sha1(f.read() + f"grid{min_cell_size}".encode()).hexdigest()
+        cached_path = os.path.join(cache_dir, f"{key}.png")
+        if os.path.exists(cached_path):
+            with Image.open(image_path) as img:
+                width, height = img.size
+            return cached_path, max(1, height // min_cell_size), max(1, width // min_cell_size)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            output_path = cached_path
+        except OSError:
+            pass  # キャッシュ先に書けなければ従来通り元画像の隣に出力する
+
     with Image.open(image_path) as img:
         img = img.convert("RGBA")
         width, height = img.size
@@ -111,8 +135,17 @@ def add_grid_overlay(image_path: str, min_cell_size: int = 150) -> Tuple[str, in
 
         out = Image.alpha_composite(img, overlay)
         
-        output_path = f"{os.path.splitext(image_path)[0]}.grid.png"
-        out.save(output_path)
+        # 並行実行中の別スレッド・別プロセスが書きかけのファイルを読まないよう、
+        # 書き手ごとに一意な一時ファイルへ保存してから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            out.save(tmp_path, format="PNG")
+            os.replace(tmp_path, output_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
         return output_path, rows, cols
 
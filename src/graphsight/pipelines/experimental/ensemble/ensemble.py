@@ -2,8 +2,11 @@
 """
 
 import base64
+import hashlib
 import json
+import os
 import re
+import tempfile
 import concurrent.futures
 from typing import List, Dict, Set, Any
 from dataclasses import dataclass, field
@@ -15,54 +18,62 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from loguru import logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional; stdlib json fallback
+    _json_loads = json.loads
+
+# JSON body of an LLM reply: the first ``` fence (optionally tagged json), unterminated fence tolerated
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|\Z)", re.DOTALL)
+
 # =============================================================================
 # Data Models
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     id: str
     label: str
     shape: str = "rect"
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     src: str
     dst: str
     label: str = ""
     style: str = "-->"
 
-@dataclass
+@dataclass(slots=True)
 class GraphStructure:
     direction: str = "TD"
     nodes: Dict[str, Node] = field(default_factory=dict)
     edges: List[Edge] = field(default_factory=list)
 
+    _BRACKETS = {
+        "rect": ("[", "]"), "round": ("(", ")"), "diamond": ("{", "}"),
+        "stadium": ("([", "])"), "hex": ("{{", "}}"), "circle": ("((", "))"),
+    }
+
     def to_mermaid(self) -> str:
-        lines = [f"graph {self.direction}"]
+        nodes = self.nodes
+        parts = [f"graph {self.direction}"]
         
         # Sort for consistency
-        sorted_nodes = sorted(self.nodes.values(), key=lambda n: n.id)
-        for node in sorted_nodes:
-            lines.append(f"    {self._node_str(node)}")
-
-        sorted_edges = sorted(self.edges, key=lambda e: (e.src, e.dst))
-        for edge in sorted_edges:
-            # Ensure safe output even if node is missing (though union logic prevents this)
-            if edge.src in self.nodes and edge.dst in self.nodes:
-                if edge.label:
-                    lines.append(f"    {edge.src} {edge.style}|{edge.label}| {edge.dst}")
-                else:
-                    lines.append(f"    {edge.src} {edge.style} {edge.dst}")
-        return "\n".join(lines)
+        node_str = self._node_str
+        parts.extend(f"    {node_str(n)}" for n in sorted(nodes.values(), key=lambda n: n.id))
 
-    @staticmethod
-    def _node_str(node: Node) -> str:
-        brackets = {
-            "rect": ("[", "]"), "round": ("(", ")"), "diamond": ("{", "}"),
-            "stadium": ("([", "])"), "hex": ("{{", "}}"), "circle": ("((", "))"),
-        }
-        l, r = brackets.get(node.shape, ("[", "]"))
+        # Ensure safe output even if node is missing (though union logic prevents this)
+        parts.extend(
+            f"    {e.src} {e.style}|{e.label}| {e.dst}" if e.label else f"    {e.src} {e.style} {e.dst}"
+            for e in sorted(self.edges, key=lambda e: (e.src, e.dst))
+            if e.src in nodes and e.dst in nodes
+        )
+        return "\n".join(parts)
+
+    @classmethod
+    def _node_str(cls, node: Node) -> str:
+        l, r = cls._BRACKETS.get(node.shape, ("[", "]"))
         safe_label = node.label.replace('"', '').replace('\n', ' ')
         return f'{node.id}{l}"{safe_label}"{r}'
 
@@ -82,149 +93,293 @@ class MermaidParser:
         (r'-->', '-->'), (r'---', '---'),
     ]
 
+    # Compiled once at class load (per-call re.* goes through the bounded re cache)
+    _SHAPE_RES = [(re.compile(r'^([A-Za-z0-9_]+)\s*' + pat + r'$'), shape) for pat, shape in SHAPE_PATTERNS]
+    # All arrow styles as one alternation (longest first); the matched text is the style
+    _ARROW_ALT = '|'.join(pat for pat, _ in ARROW_PATTERNS)
+    _STYLE_RE = re.compile(_ARROW_ALT)
+    # One pass for "A -->|label| B" (tried first) and "A --> B"
+    _EDGE_RE = re.compile(
+        rf'^(?:(?P<lsrc>.+?)\s*(?P<lstyle>{_ARROW_ALT})\s*\|(?P<label>.+?)\|\s*(?P<ldst>.+)'
+        rf'|(?P<src>.+?)\s*(?P<style>{_ARROW_ALT})\s*(?P<dst>.+))$'
+    )
+    _INLINE_LABEL_RE = re.compile(r'^(.+?)\s+--\s+(.+?)\s+-->\s+(.+)$')
+    _CHAIN_SPLIT_RE = re.compile(rf'\s*({_ARROW_ALT})\s*')
+    # Node labels ("...", [...], (...), {...}); quotes inside are skipped whole. A bracket of the same kind
+    # can't appear inside, so an unclosed "A[x --> B[y]" doesn't swallow the next label
+    _LABEL_SPAN_RE = re.compile(r'"[^"]*"|\[(?:"[^"]*"|[^\[\]"])*\]|\((?:"[^"]*"|[^()"])*\)|\{(?:"[^"]*"|[^{}"])*\}')
+    _PREPROC_RE = re.compile(r'\s*--\|(.+?)\|\s*-->')
+    _DIRECTION_RE = re.compile(r'^(graph|flowchart)\s+(.+)')
+    _SAFE_ID_RE = re.compile(r'[^A-Za-z0-9_]')
+
     @classmethod
     def parse(cls, code: str) -> GraphStructure:
         graph = GraphStructure()
+        cache: Dict[str, str] = {}  # text -> nid, valid for this graph only
         lines = code.strip().splitlines()
         for line in lines:
             line = cls._preprocess(line.strip())
-            if not line or line.startswith("%%") or line.startswith("classDef"): continue
+            if not line or line.startswith(("%%", "classDef")): continue
             
             # Direction
-            if re.match(r'^(graph|flowchart)\s+', line):
-                m = re.match(r'^(graph|flowchart)\s+(.+)', line)
-                if m: graph.direction = m.group(2)
+            m = cls._DIRECTION_RE.match(line)
+            if m:
+                graph.direction = m.group(2)
                 continue
             
             # Edges & Nodes
-            if not cls._parse_edge(line, graph):
-                cls._parse_node(line, graph)
+            if not cls._parse_edge(line, graph, cache):
+                cls._parse_node(line, graph, cache)
         return graph
 
     @classmethod
     def _preprocess(cls, line: str) -> str:
-        line = re.sub(r'\s*--\|(.+?)\|\s*-->', r' -->|\1|', line)
+        line = cls._PREPROC_RE.sub(r' -->|\1|', line)
         return line
 
     @classmethod
-    def _parse_edge(cls, line: str, graph: GraphStructure) -> bool:
+    def _mask_labels(cls, line: str) -> str:
+        """Same-length copy of line with label contents blanked, so arrows inside labels are not matched."""
+        return cls._LABEL_SPAN_RE.sub(lambda m: m.group()[0] + '_' * (len(m.group()) - 2) + m.group()[-1], line)
+
+    @staticmethod
+    def _slice(line: str, m: re.Match, *groups) -> List[str]:
+        """Groups of a match against the masked line, cut from the original line."""
+        return [line[m.start(g):m.end(g)] for g in groups]
+
+    @classmethod
+    def _parse_edge(cls, line: str, graph: GraphStructure, cache: Dict[str, str] | None = None) -> bool:
+        # Match on the masked line, take the text from the original
+        masked = cls._mask_labels(line)
+
         # Inline label check
-        m = re.match(r'^(.+?)\s+--\s+(.+?)\s+-->\s+(.+)$', line)
+        m = cls._INLINE_LABEL_RE.match(masked)
         if m:
-            s, l, d = m.groups()
-            graph.edges.append(Edge(cls._get_nid(s, graph), cls._get_nid(d, graph), l.strip(), "-->"))
+            s, l, d = cls._slice(line, m, 1, 2, 3)
+            graph.edges.append(Edge(cls._get_nid(s, graph, cache), cls._get_nid(d, graph, cache), l.strip(), "-->"))
             return True
             
-        # Standard check
-        for pat, style in cls.ARROW_PATTERNS:
-            # With label
-            m = re.match(rf'^(.+?)\s*{pat}\s*\|(.+?)\|\s*(.+)$', line)
-            if m:
-                s, l, d = m.groups()
-                graph.edges.append(Edge(cls._get_nid(s, graph), cls._get_nid(d, graph), l.strip(), style))
-                return True
-            # Without label
-            m = re.match(rf'^(.+?)\s*{pat}\s*(.+)$', line)
-            if m:
-                s, d = m.groups()
-                # Chain check A --> B --> C
-                if cls._contains_arrow(s): return cls._parse_chain(line, graph)
-                graph.edges.append(Edge(cls._get_nid(s, graph), cls._get_nid(d, graph), "", style))
-                return True
-        return False
+        # Standard check (single match over all arrow styles)
+        m = cls._EDGE_RE.match(masked)
+        if not m: return False
+        if m.group('label') is not None:
+            s, l, d = cls._slice(line, m, 'lsrc', 'label', 'ldst')
+            graph.edges.append(Edge(cls._get_nid(s, graph, cache), cls._get_nid(d, graph, cache), l.strip(), m.group('lstyle')))
+            return True
+        # Chain check A --> B --> C (src stops at the first arrow, so look at dst too; labels are masked)
+        if cls._contains_arrow(m.group('src')) or cls._contains_arrow(m.group('dst')):
+            return cls._parse_chain(line, graph, cache, masked)
+        s, d = cls._slice(line, m, 'src', 'dst')
+        graph.edges.append(Edge(cls._get_nid(s, graph, cache), cls._get_nid(d, graph, cache), "", m.group('style')))
+        return True
 
     @classmethod
-    def _parse_chain(cls, line: str, graph: GraphStructure) -> bool:
-        parts = re.split(r'\s*(?:-->|---|==>|-\.->)\s*', line)
-        if len(parts) < 2: return False
-        nodes = [cls._get_nid(p.strip(), graph) for p in parts]
-        for i in range(len(nodes)-1):
-            graph.edges.append(Edge(nodes[i], nodes[i+1], ""))
+    def _parse_chain(cls, line: str, graph: GraphStructure, cache: Dict[str, str] | None = None,
+                     masked: str | None = None) -> bool:
+        # Split where the masked line has arrows, yielding [node, style, node, style, node, ...] from the original
+        parts, prev = [], 0
+        for m in cls._CHAIN_SPLIT_RE.finditer(masked if masked is not None else cls._mask_labels(line)):
+            parts += [line[prev:m.start()], m.group(1)]
+            prev = m.end()
+        parts.append(line[prev:])
+        if len(parts) < 3: return False
+        nodes = [cls._get_nid(p.strip(), graph, cache) for p in parts[::2]]
+        for i, style in enumerate(parts[1::2]):
+            graph.edges.append(Edge(nodes[i], nodes[i+1], "", style))
         return True
 
     @classmethod
     def _contains_arrow(cls, text: str) -> bool:
-        return any(re.search(p, text) for p, _ in cls.ARROW_PATTERNS)
+        return cls._STYLE_RE.search(text) is not None
+
+    @classmethod
+    def _parse_node(cls, line: str, graph: GraphStructure, cache: Dict[str, str] | None = None):
+        cls._get_nid(line, graph, cache)
 
     @classmethod
-    def _parse_node(cls, line: str, graph: GraphStructure):
-        cls._get_nid(line, graph)
+    def _get_nid(cls, text: str, graph: GraphStructure, cache: Dict[str, str] | None = None) -> str:
+        # Per-parse memo: a text seen before in this graph resolves to the same (already registered) node
+        if cache is not None and text in cache: return cache[text]
+        nid = cls._resolve_nid(text, graph)
+        if cache is not None: cache[text] = nid
+        return nid
 
     @classmethod
-    def _get_nid(cls, text: str, graph: GraphStructure) -> str:
-        for pat, shape in cls.SHAPE_PATTERNS:
-            m = re.match(rf'^([A-Za-z0-9_]+)\s*' + pat + r'$', text)
+    def _resolve_nid(cls, text: str, graph: GraphStructure) -> str:
+        for shape_re, shape in cls._SHAPE_RES:
+            m = shape_re.match(text)
             if m:
                 nid, lbl = m.groups()
                 if nid not in graph.nodes: graph.nodes[nid] = Node(nid, lbl.strip(), shape)
                 return nid
-        safe_id = re.sub(r'[^A-Za-z0-9_]', '', text)
+        safe_id = cls._SAFE_ID_RE.sub('', text)
         if not safe_id: safe_id = "UNKNOWN"
         if safe_id not in graph.nodes: graph.nodes[safe_id] = Node(safe_id, text, "rect")
         return safe_id
 
 
+# =============================================================================
+# LLM Response Cache
+# =============================================================================
+
+class LLMResponseCache:
+    """Memory + disk cache of raw LLM response texts.
+
+    All calls run at temperature=0, so (model, system prompt, human content) -> response
+    is treated as deterministic. Disk entries are one JSON file per key; directory=None
+    keeps the cache in memory only.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self._mem: Dict[str, str] = {}
+        self._dir = Path(directory).expanduser() if directory else None
+        if self._dir: self._dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, system: str, human: Any = None) -> str:
+        payload = json.dumps({"model": model, "system": system, "human": human}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if key in self._mem: return self._mem[key]
+        if not self._dir: return None
+        try:
+            content = json.loads((self._dir / f"{key}.json").read_text(encoding="utf-8"))["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._mem[key] = content
+        return content
+
+    def put(self, key: str, content: str):
+        self._mem[key] = content
+        if not self._dir: return
+        try:
+            # Unique temp file per writer (threads share a pid), then an atomic rename
+            fd, tmp = tempfile.mkstemp(dir=self._dir, prefix=f"{key}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"content": content}, ensure_ascii=False))
+            os.replace(tmp, self._dir / f"{key}.json")  # concurrent readers never see a partial file
+        except OSError as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+
 # =============================================================================
 # GraphSight Agent v9 (Union Logic)
 # =============================================================================
 
 class GraphSightAgent:
+    # Label overlap (Jaccard-ish, vs target labels) above which an id-aligned draft skips the mapping call
+    IDENTITY_OVERLAP = 0.9
+
+    PERSPECTIVES = {
+        "Structuralist": "Focus on Semantic IDs (e.g. DeleteRequest) and logical flow.",
+        "Optimist": "High Recall. Include EVERYTHING. Even faint lines.",
+        "Pessimist": "High Precision. Only clear text/lines."
+    }
+    # Persona drafts differ only in name/role
+    _DRAFT_PROMPT = """You are the {name}. {role}
+Output JSON: {{ "mermaid": "graph TD\\n..." }}"""
     
-    def __init__(self, model: str = "gpt-5"):
+    def __init__(self, model: str = "gpt-5", cache_dir: str | None = None):
+        # cache_dir opts in to a persistent response cache (e.g. "~/.graphsight_cache/ensemble"); default is memory only
         # Temperature=0 for deterministic steps, but drafts have built-in persona bias
+        self.model = model
         self.llm = ChatOpenAI(model=model, temperature=0)
+        self._cache = LLMResponseCache(cache_dir)
+        self._image_cache: Dict[tuple, list] = {}  # (path, mtime) -> image content
+        # Shared by the draft and normalization stages (3 drafts / 2 mappings at a time) across runs
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=6, thread_name_prefix="graphsight")
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): self.close()
+
+    def _invoke_json(self, system: str, human: Any = None) -> Dict[str, Any]:
+        """LLM call returning parsed JSON. Responses are cached only once they parse."""
+        key = LLMResponseCache.key(self.model, system, human)
+        content = self._cache.get(key)
+        if content is not None:
+            logger.debug("💾 LLM cache hit")
+            return self._parse_json(content)
+        messages = [SystemMessage(content=system)]
+        if human is not None: messages.append(HumanMessage(content=human))
+        content = self.llm.invoke(messages).content
+        data = self._parse_json(content)
+        self._cache.put(key, content)
+        return data
 
     def run(self, image_path: str) -> str:
         logger.info(f"🚀 [GraphSight v9 Union] Processing: {image_path}")
         image_content = self._load_image(image_path)
         
-        # 1. Draft
-        drafts = self._generate_drafts(image_content)
-        
-        # 2. Normalize (Critical Step)
-        normalized_drafts = self._normalize_ids(drafts)
+        # 1+2. Draft & Normalize (Critical Step), pipelined
+        normalized_drafts = self._draft_and_normalize(image_content)
         
         # 3. Union Merge (Adopt if ANY present)
         final_graph = self._merge_union(normalized_drafts)
         
-        logger.info(f"✅ Final Graph: {len(final_graph.nodes)} nodes, {len(final_graph.edges)} edges")
+        logger.opt(lazy=True).info("✅ Final Graph: {n} nodes, {e} edges", n=lambda: len(final_graph.nodes), e=lambda: len(final_graph.edges))
         return final_graph.to_mermaid()
 
-    def _generate_drafts(self, image_content) -> Dict[str, GraphStructure]:
-        perspectives = {
-            "Structuralist": "Focus on Semantic IDs (e.g. DeleteRequest) and logical flow.",
-            "Optimist": "High Recall. Include EVERYTHING. Even faint lines.",
-            "Pessimist": "High Precision. Only clear text/lines."
-        }
-        results = {}
-        
-        def _run(name, role):
-            prompt = f"""You are the {name}. {role}
-Output JSON: {{ "mermaid": "graph TD\\n..." }}"""
-            try:
-                resp = self.llm.invoke([SystemMessage(content=prompt), HumanMessage(content=image_content)])
-                mermaid = self._parse_json(resp.content).get("mermaid", "")
-                return name, MermaidParser.parse(mermaid)
-            except Exception as e:
-                logger.error(f"{name} failed: {e}")
-                return name, GraphStructure()
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as ex:
-            futures = [ex.submit(_run, n, p) for n, p in perspectives.items()]
-            for f in concurrent.futures.as_completed(futures):
-                n, g = f.result()
-                if g.nodes: results[n] = g
-        return results
-
-    def _normalize_ids(self, drafts: Dict[str, GraphStructure]) -> Dict[str, GraphStructure]:
-        if "Structuralist" not in drafts: return drafts
-        
-        anchor = drafts["Structuralist"]
+    def _draft(self, name, role, image_content):
+        try:
+            prompt = self._DRAFT_PROMPT.format(name=name, role=role)
+            mermaid = self._invoke_json(prompt, image_content).get("mermaid", "")
+            return name, self._dedupe_edges(MermaidParser.parse(mermaid))
+        except Exception as e:
+            logger.error(f"{name} failed: {e}")
+            return name, GraphStructure()
+
+    def _draft_and_normalize(self, image_content) -> Dict[str, GraphStructure]:
+        """Draft every perspective and map each draft's ids onto the Structuralist (anchor) draft.
+        A draft is mapped as soon as it and the anchor are in, overlapping the mapping calls with the
+        drafts still in flight. Without an anchor the drafts are returned as is."""
+        drafts: Dict[str, GraphStructure] = {}
+        waiting = []     # drafts that arrived before the anchor
+        mapped = []      # futures of _normalize_one
+        normalize = None
+        futures = [self._pool.submit(self._draft, n, p, image_content) for n, p in self.PERSPECTIVES.items()]
+        for f in concurrent.futures.as_completed(futures):
+            n, g = f.result()
+            if not g.nodes: continue
+            drafts[n] = g
+            if n == "Structuralist":
+                normalize = self._id_normalizer(g)
+                mapped += [self._pool.submit(normalize, *w) for w in waiting]
+            elif normalize: mapped.append(self._pool.submit(normalize, n, g))
+            else: waiting.append((n, g))
+
+        if normalize is None: return drafts  # No anchor -> nothing to normalize against
+        normalized = {"Structuralist": drafts["Structuralist"]}
+        for f in concurrent.futures.as_completed(mapped):
+            n, g = f.result()
+            normalized[n] = g
+        return normalized
+
+    @staticmethod
+    def _dedupe_edges(graph: GraphStructure) -> GraphStructure:
+        """Keep the first edge per (src, dst); LLMs often repeat an edge within one draft."""
+        first = {}
+        for e in graph.edges: first.setdefault((e.src, e.dst), e)
+        if len(first) < len(graph.edges): graph.edges = list(first.values())
+        return graph
+
+    def _id_normalizer(self, anchor: GraphStructure):
+        """Returns normalize(name, graph) -> (name, graph with ids remapped onto the anchor's)."""
         anchor_txt = "\n".join([f"- {n.id}: {n.label}" for n in anchor.nodes.values()])
-        mappings = {}
+        anchor_labels = {n.label.lower().strip() for n in anchor.nodes.values()}
+
+        def _map(name, graph):
+            # Same ids and (nearly) the same labels -> the LLM would return identity anyway
+            target_labels = {n.label.lower().strip() for n in graph.nodes.values()}
+            overlap = len(anchor_labels & target_labels) / max(len(target_labels), 1)
+            if overlap > self.IDENTITY_OVERLAP and graph.nodes.keys() == anchor.nodes.keys():
+                logger.debug("⏭️ {}: ids already aligned, skipping normalization", name)
+                return {}
 
-        for name, graph in drafts.items():
-            if name == "Structuralist": continue
             target_txt = "\n".join([f"- {n.id}: {n.label}" for n in graph.nodes.values()])
             
             prompt = f"""
@@ -239,32 +394,29 @@ List B:
 {target_txt}
 """
             try:
-                resp = self.llm.invoke([SystemMessage(content=prompt)])
-                mappings[name] = self._parse_json(resp.content).get("mapping", {})
-            except: mappings[name] = {}
-
-        # Apply
-        normalized = {"Structuralist": anchor}
-        for name, graph in drafts.items():
-            if name == "Structuralist": continue
-            mapping = mappings.get(name, {})
-            new_nodes = {}
-            id_map = {} # Local ID remap
-            
-            for nid, node in graph.nodes.items():
-                new_id = mapping.get(nid, nid)
-                id_map[nid] = new_id
-                # Keep original label/shape for now
-                new_nodes[new_id] = Node(new_id, node.label, node.shape)
-            
-            new_edges = []
-            for e in graph.edges:
-                s, d = id_map.get(e.src, e.src), id_map.get(e.dst, e.dst)
-                new_edges.append(Edge(s, d, e.label, e.style))
-                
-            normalized[name] = GraphStructure(graph.direction, new_nodes, new_edges)
+                return self._invoke_json(prompt).get("mapping", {})
+            except Exception: return {}
+
+        def normalize(name, graph):
+            return name, self._apply_mapping(graph, _map(name, graph))
+
+        return normalize
+
+    @staticmethod
+    def _apply_mapping(graph: GraphStructure, mapping: Dict[str, str]) -> GraphStructure:
+        # Identity (or only unknown ids) -> nothing to remap, reuse the draft as is
+        if not any(mapping.get(nid, nid) != nid for nid in graph.nodes): return graph
+
+        new_nodes = {}
+        for nid, node in graph.nodes.items():
+            new_id = mapping.get(nid, nid)
+            # Keep original label/shape for now
+            new_nodes[new_id] = Node(new_id, node.label, node.shape)
         
-        return normalized
+        # Edge endpoints are always nodes of the same draft (the parser registers them), so `mapping` is the id remap
+        new_edges = [Edge(mapping.get(e.src, e.src), mapping.get(e.dst, e.dst), e.label, e.style) for e in graph.edges]
+            
+        return GraphStructure(graph.direction, new_nodes, new_edges)
 
     def _merge_union(self, drafts: Dict[str, GraphStructure]) -> GraphStructure:
         """
@@ -277,7 +429,12 @@ List B:
         # Priority order determines whose LABEL/SHAPE wins, but EXISTENCE is purely additive.
         priority = ["Structuralist", "Optimist", "Pessimist"]
         
-        # 1. Merge Nodes
+        # Single pass over the drafts: nodes first, then edges, per draft
+        # Use a set to track unique edges (src, dst) to avoid duplication
+        existing_edges = set()
+        # Edge endpoints not declared (yet) by any draft's node table
+        undeclared = []
+
         for name in priority:
             if name not in drafts: continue
             graph = drafts[name]
@@ -286,49 +443,37 @@ List B:
                 final.direction = graph.direction
             
             for nid, node in graph.nodes.items():
-                if nid not in final.nodes:
-                    # New node found! Add it.
-                    final.nodes[nid] = node
-                else:
-                    # Node exists. 
-                    # Optionally: Update label if current is "better" (longer)?
-                    # For now, stick to Priority Order (Structuralist label wins).
-                    pass
-
-        # 2. Merge Edges
-        # Use a set to track unique edges (src, dst) to avoid duplication
-        existing_edges = set()
-        
-        for name in priority:
-            if name not in drafts: continue
-            graph = drafts[name]
-            
+                # New node found -> add it. Existing: stick to Priority Order (Structuralist label wins).
+                if nid not in final.nodes: final.nodes[nid] = node
+
             for edge in graph.edges:
                 # Union Logic: Add if (src, dst) not present
                 pair = (edge.src, edge.dst)
                 if pair not in existing_edges:
-                    # Safeguard: Ensure nodes exist (Logic: Union implies nodes are already added above)
-                    # But if an edge references a missing node (rare but possible), create a dummy node.
-                    if edge.src not in final.nodes:
-                        final.nodes[edge.src] = Node(edge.src, edge.src)
-                    if edge.dst not in final.nodes:
-                        final.nodes[edge.dst] = Node(edge.dst, edge.dst)
-                        
+                    if edge.src not in final.nodes: undeclared.append(edge.src)
+                    if edge.dst not in final.nodes: undeclared.append(edge.dst)
                     final.edges.append(edge)
                     existing_edges.add(pair)
 
+        # Safeguard: an edge may reference a node that a LOWER-priority draft declares, so only
+        # fall back to a dummy node once every draft's nodes are in.
+        for nid in undeclared:
+            if nid not in final.nodes: final.nodes[nid] = Node(nid, nid)
+
         return final
 
     def _load_image(self, path):
-        with open(path, "rb") as f: b64 = base64.b64encode(f.read()).decode()
-        return [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}]
+        key = (path, os.path.getmtime(path))
+        if key not in self._image_cache:
+            with open(path, "rb") as f: b64 = base64.b64encode(f.read()).decode()
+            self._image_cache[key] = [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}]
+        return self._image_cache[key]
 
     def _parse_json(self, t):
-        t = t.strip()
-        if "```" in t: t = t.split("json")[-1].split("```")[0]
-        return json.loads(t.strip())
+        m = _JSON_FENCE_RE.search(t)
+        return _json_loads(m.group(1) if m else t.strip())
 
 if __name__ == "__main__":
     if len(sys.argv) < 2: sys.exit(1)
-    print(GraphSightAgent().run(sys.argv[1]))
+    with GraphSightAgent() as agent: print(agent.run(sys.argv[1]))
 
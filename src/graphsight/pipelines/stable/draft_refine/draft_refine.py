@@ -38,8 +38,14 @@ GraphSight Agent v6 — Draft → Refine Architecture (Structural Diff Edition)
 """
 
 import base64
+import concurrent.futures
 import json
+import mmap
+import os
 import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
 from typing import List, Optional
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -60,11 +66,48 @@ from .models import (
 )
 from graphsight.bridge.client import NodeMermaidBridge
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps_pretty(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:  # orjson は任意依存。無ければ標準の json を使う
+    _json_loads = json.loads
+
+    def _json_dumps_pretty(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+# LLM応答からJSON本体を取り出すフェンス。```json を優先し、無ければ最初の ``` ブロック。
+# 閉じフェンスが無い場合は末尾まで
+_JSON_FENCE_RE = re.compile(r"```json(.*?)(?:```|\Z)", re.S)
+_ANY_FENCE_RE = re.compile(r"```(.*?)(?:```|\Z)", re.S)
+
+
+@lru_cache(maxsize=128)
+def _load_image_cached(path: str, mtime: float) -> tuple:
+    """画像ファイルを base64 の image_url コンテンツにする。
+
+    Draft / Refine / Enhancement で同じファイルを何度も送るので (path, mtime) でキャッシュする。
+    ファイルが書き換えられれば mtime が変わり、再エンコードされる。
+    """
+    with open(path, "rb") as f:
+        # mmap ならファイル全体を bytes にコピーせずにエンコードできる（空ファイルは mmap 不可）
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                b64 = base64.b64encode(mm).decode("ascii")
+        else:
+            b64 = ""
+    ext = Path(path).suffix.lower()
+    mime = "image/png" if ext == ".png" else "image/jpeg"
+    return ({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}},)
+
 
 class DraftRefinePipeline(BasePipeline):
 
     MAX_REFINE_CHECKS = 20   # Refineフェーズで確認する疑問点の上限
     CROP_MARGIN_RATIO = 0.5  # crop座標に追加するマージン比率
+    MAX_REFINE_WORKERS = 8   # 疑問点の確認を並行実行するスレッド数の上限
 
     def __init__(self, model: str = "gpt-5.2"):
         try:
@@ -75,14 +118,18 @@ class DraftRefinePipeline(BasePipeline):
     def run(self, image_path: str) -> str:
         logger.info(f"🚀 Starting Draft→Refine for: {image_path}")
 
-        # 画像サイズ取得
-        info = ImageProcessor.get_image_info.invoke({"image_path": image_path})
+        # 画像サイズ取得と base64 エンコードは互いに独立なので並行に行う
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as ex:
+            fut_info = ex.submit(ImageProcessor.get_image_info.invoke, {"image_path": image_path})
+            fut_image = ex.submit(self._load_image, image_path)
+            info = fut_info.result()
+            image_content = fut_image.result()
         parts = info.replace("Image Size: ", "").split("x")
         img_w, img_h = int(parts[0]), int(parts[1])
         logger.info(f"📐 Image: {img_w}x{img_h}")
 
         # ===== Phase 1: Draft =====
-        draft = self._phase_draft(image_path, img_w, img_h)
+        draft = self._phase_draft(image_path, img_w, img_h, image_content)
         logger.info(f"📝 Draft: {draft.confidence:.0%} confidence, "
                      f"{len(draft.uncertain_points)} uncertain points")
 
@@ -122,10 +169,12 @@ class DraftRefinePipeline(BasePipeline):
     # Phase 1: Draft — 全体画像からMermaid一発生成 + 自己レビュー
     # -----------------------------------------------------------------
 
-    def _phase_draft(self, image_path: str, img_w: int, img_h: int) -> DraftOutput:
+    def _phase_draft(self, image_path: str, img_w: int, img_h: int,
+                     image_content: Optional[list] = None) -> DraftOutput:
         logger.info("=" * 50 + " Phase 1: DRAFT")
 
-        image_content = self._load_image(image_path)
+        if image_content is None:
+            image_content = self._load_image(image_path)
 
         response = self.llm.invoke([
             SystemMessage(content=f"""You are an expert at converting flowchart images to Mermaid diagrams.
@@ -227,13 +276,38 @@ Output ONLY this JSON (no other text):
             logger.info("   No uncertain points — returning normalized draft")
             return draft_graph.to_mermaid()
 
-        # 各疑問点をcropで確認
+        # 各疑問点をcropで確認。まず全cropを1回のマルチ画像呼び出しでまとめて確認する
         for u in draft.uncertain_points:
             logger.info(f"   🔍 Checking {u.id}: {u.description}")
-            u.resolution = self._check_uncertain_point(
-                image_path, img_w, img_h, u, draft.mermaid_code
-            )
-            logger.info(f"      ✅ {u.resolution[:100]}")
+        pending = self._check_uncertain_points_batch(
+            image_path, img_w, img_h, draft.uncertain_points, draft.mermaid_code
+        )
+        pending_ids = {id(u) for u, _ in pending}
+        for u in draft.uncertain_points:
+            if id(u) not in pending_ids:
+                logger.info(f"      ✅ {u.id}: {u.resolution[:100]}")
+
+        # バッチで回答が得られなかった点だけ、バッチで作ったcropを使って個別に確認する。
+        # 互いに独立した I/O 待ちなので並行に投げるが、同じcropを共有する点は enhance の出力先も
+        # 同じファイルになるので、cropごとに1タスクにまとめて順に確認する
+        if pending:
+            logger.info(f"   🔁 {len(pending)} points unanswered in batch — checking individually")
+            groups: dict[str, list[UncertainPoint]] = defaultdict(list)
+            for u, crop_path in pending:
+                groups[crop_path].append(u)
+
+            def check_group(crop_path: str, group: list[UncertainPoint]):
+                for u in group:
+                    u.resolution = self._check_uncertain_point(
+                        image_path, img_w, img_h, u, draft.mermaid_code, crop_path
+                    )
+                    logger.info(f"      ✅ {u.id}: {u.resolution[:100]}")
+
+            workers = min(self.MAX_REFINE_WORKERS, len(groups))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
+                futures = [ex.submit(check_group, crop_path, group) for crop_path, group in groups.items()]
+                for f in concurrent.futures.as_completed(futures):
+                    f.result()
 
         # 修正が必要な箇所を抽出
         corrections = [u for u in draft.uncertain_points
@@ -263,20 +337,19 @@ Output ONLY this JSON (no other text):
     ) -> GraphStructure:
         """修正をグラフ操作コマンドとして適用する"""
 
-        import copy
-        graph = copy.deepcopy(graph)  # 元のグラフを壊さない
+        graph = graph.clone()  # 元のグラフを壊さない
 
         corrections_text = "\n".join(
             f"- {u.id}: {u.resolution}" for u in corrections
         )
 
-        current_structure = json.dumps({
+        current_structure = _json_dumps_pretty({
             "direction": graph.direction,
             "nodes": {nid: {"label": n.label, "shape": n.shape}
                       for nid, n in graph.nodes.items()},
             "edges": [{"src": e.src, "dst": e.dst, "label": e.label, "style": e.style}
                       for e in graph.edges]
-        }, ensure_ascii=False, indent=2)
+        })
 
         response = self.llm.invoke([
             SystemMessage(content=f"""You have a graph structure and a list of corrections to apply.
@@ -318,13 +391,20 @@ Rules:
             logger.warning(f"Falling back to draft graph (no corrections applied)")
             return graph
 
+        # (src, dst) → エッジのインデックス。操作ごとの全エッジ走査を避ける
+        edge_index: dict[tuple[str, str], list[Edge]] = defaultdict(list)
+        for e in graph.edges:
+            edge_index[(e.src, e.dst)].append(e)
+        # 削除対象エッジの id()。graph.edges の再構築は全操作の後に1回だけ行う
+        removed_edge_ids: set[int] = set()
+
         # 操作を1つずつ適用
         applied = 0
         for op_data in data.get("operations", []):
             op = op_data.get("op")
             try:
                 if op == "relabel":
-                    nid = op_data["node_id"]
+                    nid = sys.intern(op_data["node_id"])
                     if nid in graph.nodes:
                         old = graph.nodes[nid].label
                         graph.nodes[nid].label = op_data["new_label"]
@@ -334,7 +414,7 @@ Rules:
                         logger.warning(f"      ⚠️  relabel: node '{nid}' not found")
 
                 elif op == "reshape":
-                    nid = op_data["node_id"]
+                    nid = sys.intern(op_data["node_id"])
                     if nid in graph.nodes:
                         old = graph.nodes[nid].shape
                         graph.nodes[nid].shape = op_data["new_shape"]
@@ -344,34 +424,33 @@ Rules:
                         logger.warning(f"      ⚠️  reshape: node '{nid}' not found")
 
                 elif op == "add_edge":
-                    src, dst = op_data["src"], op_data["dst"]
+                    src, dst = sys.intern(op_data["src"]), sys.intern(op_data["dst"])
                     # 重複チェック
-                    if not any(e.src == src and e.dst == dst for e in graph.edges):
-                        graph.edges.append(Edge(
+                    if not edge_index.get((src, dst)):
+                        edge = Edge(
                             src=src, dst=dst,
                             label=op_data.get("label", ""),
                             style=op_data.get("style", "-->")
-                        ))
+                        )
+                        graph.edges.append(edge)
+                        edge_index[(src, dst)].append(edge)
                         logger.info(f"      ➕ add_edge: {src} → {dst}")
                         applied += 1
                     else:
                         logger.info(f"      ⏭️  add_edge: {src} → {dst} already exists")
 
                 elif op == "remove_edge":
-                    src, dst = op_data["src"], op_data["dst"]
-                    before_count = len(graph.edges)
-                    graph.edges = [
-                        e for e in graph.edges
-                        if not (e.src == src and e.dst == dst)
-                    ]
-                    if len(graph.edges) < before_count:
+                    src, dst = sys.intern(op_data["src"]), sys.intern(op_data["dst"])
+                    removed = edge_index.pop((src, dst), None)
+                    if removed:
+                        removed_edge_ids.update(map(id, removed))
                         logger.info(f"      ➖ remove_edge: {src} → {dst}")
                         applied += 1
                     else:
                         logger.warning(f"      ⚠️  remove_edge: {src} → {dst} not found")
 
                 elif op == "add_node":
-                    nid = op_data["node_id"]
+                    nid = sys.intern(op_data["node_id"])
                     if nid not in graph.nodes:
                         graph.nodes[nid] = Node(
                             id=nid,
@@ -384,27 +463,27 @@ Rules:
                         logger.info(f"      ⏭️  add_node: {nid} already exists")
 
                 elif op == "remove_node":
-                    nid = op_data["node_id"]
+                    nid = sys.intern(op_data["node_id"])
                     if nid in graph.nodes:
                         graph.nodes.pop(nid)
                         # 関連エッジも除去
-                        graph.edges = [e for e in graph.edges
-                                       if e.src != nid and e.dst != nid]
+                        for key in [k for k in edge_index if nid in k]:
+                            removed_edge_ids.update(map(id, edge_index.pop(key)))
                         logger.info(f"      ➖ remove_node: {nid}")
                         applied += 1
                     else:
                         logger.warning(f"      ⚠️  remove_node: '{nid}' not found")
 
                 elif op == "relabel_edge":
-                    src, dst = op_data["src"], op_data["dst"]
-                    for e in graph.edges:
-                        if e.src == src and e.dst == dst:
-                            old = e.label
-                            e.label = op_data.get("new_label", "")
-                            logger.info(f"      ✏️  relabel_edge {src}→{dst}: "
-                                        f"'{old}' → '{e.label}'")
-                            applied += 1
-                            break
+                    src, dst = sys.intern(op_data["src"]), sys.intern(op_data["dst"])
+                    edges = edge_index.get((src, dst))
+                    if edges:
+                        e = edges[0]
+                        old = e.label
+                        e.label = op_data.get("new_label", "")
+                        logger.info(f"      ✏️  relabel_edge {src}→{dst}: "
+                                    f"'{old}' → '{e.label}'")
+                        applied += 1
                     else:
                         logger.warning(f"      ⚠️  relabel_edge: edge {src}→{dst} not found")
 
@@ -414,6 +493,9 @@ Rules:
             except (KeyError, TypeError) as e:
                 logger.warning(f"      ⚠️  Skipped invalid op: {op_data} ({e})")
 
+        if removed_edge_ids:
+            graph.edges = [e for e in graph.edges if id(e) not in removed_edge_ids]
+
         logger.info(f"   Total operations applied: {applied}/{len(data.get('operations', []))}")
         return graph
 
@@ -421,11 +503,8 @@ Rules:
     # 疑問点の確認（crop + enhance）
     # -----------------------------------------------------------------
 
-    def _check_uncertain_point(
-        self, image_path: str, img_w: int, img_h: int,
-        point: UncertainPoint, current_mermaid: str
-    ) -> str:
-        """1つの不確実箇所をcropで確認し、結論を返す"""
+    def _crop_box(self, img_w: int, img_h: int, point: UncertainPoint) -> tuple[int, int, int, int]:
+        """不確実箇所のcrop範囲 (x, y, w, h)。crop画像のファイル名はこの4値で決まる"""
 
         # マージン追加（対象が見切れるリスクを低減）
         margin_x = int(point.crop_w * self.CROP_MARGIN_RATIO)
@@ -434,14 +513,198 @@ Rules:
         crop_y = max(0, point.crop_y - margin_y)
         crop_w = min(point.crop_w + margin_x * 2, img_w - crop_x)
         crop_h = min(point.crop_h + margin_y * 2, img_h - crop_y)
+        return crop_x, crop_y, crop_w, crop_h
 
-        # Step 1: 通常cropで確認
-        crop_path = ImageProcessor.crop_region.invoke({
+    def _crop_uncertain_point(
+        self, image_path: str, img_w: int, img_h: int, point: UncertainPoint
+    ) -> str:
+        """不確実箇所をマージン付きでcropし、crop画像のパス（失敗時は "Error..."）を返す"""
+        crop_x, crop_y, crop_w, crop_h = self._crop_box(img_w, img_h, point)
+        return ImageProcessor.crop_region.invoke({
             "image_path": image_path,
             "x": crop_x, "y": crop_y,
             "w": crop_w, "h": crop_h
         })
 
+    def _check_uncertain_points_batch(
+        self, image_path: str, img_w: int, img_h: int,
+        points: list[UncertainPoint], current_mermaid: str
+    ) -> list[tuple[UncertainPoint, str]]:
+        """複数の不確実箇所のcropを1回のLLM呼び出しでまとめて確認する。
+
+        結論が得られた点は resolution を埋める。回答が欠けた点は (点, crop画像のパス) で返すので、
+        呼び出し側で同じcropを使って _check_uncertain_point による個別確認に回す。
+        応答全体のパースに失敗した場合は、個別確認のパース失敗と同じく生の応答を resolution に残す
+        （全点を個別に問い合わせ直すと N 回の呼び出しが追加で発生するため）。
+        """
+        cropped = []
+        crops: dict[tuple[int, int, int, int], str] = {}  # 同じ範囲は1回だけcropする (出力先のファイルも同じ)
+        for u in points:
+            box = self._crop_box(img_w, img_h, u)
+            crop_path = crops.get(box)
+            if crop_path is None:
+                crop_path = crops[box] = self._crop_uncertain_point(image_path, img_w, img_h, u)
+            if isinstance(crop_path, str) and crop_path.startswith("Error"):
+                u.resolution = f"Could not crop: {crop_path}"
+            else:
+                cropped.append((u, crop_path))
+        if not cropped:
+            return []
+
+        content = []
+        for i, (u, crop_path) in enumerate(cropped, 1):
+            content.append({"type": "text", "text": (
+                f"Crop {i} ({u.id}) — Question: {u.description} / Location: {u.location}"
+            )})
+            content.extend(self._load_image(crop_path))
+
+        response = self.llm.invoke([
+            SystemMessage(content=f"""You are verifying several specific parts of a flowchart.
+
+Current diagram (for context):
+
+```mermaid
+{current_mermaid}
+```
+
+You will receive {len(cropped)} zoomed-in crops. Each crop is preceded by a line
+"Crop <n> (<id>) — Question: ... / Location: ...".
+
+For EACH crop answer:
+1. What does the text/label actually say?
+2. Where do the arrows/connections actually go?
+3. What correction (if any) is needed to the Mermaid code?
+
+Output ONLY JSON with one entry per crop:
+{{
+  "results": [
+    {{
+      "crop": 1,
+      "readable": true,
+      "finding": "<what you can now see clearly>",
+      "correction": "<specific change needed, or 'none' if draft was correct>"
+    }}
+  ]
+}}
+"""),
+            HumanMessage(content=content)
+        ])
+
+        try:
+            results = self._index_batch_results(response.content)
+        except Exception as e:
+            logger.warning(f"Batch check parse failed: {e}")
+            for u, _ in cropped:
+                u.resolution = f"Parse error: {e}. Raw: {response.content[:200]}"
+            return []
+
+        unresolved = []
+        unreadable = []
+        for i, (u, crop_path) in enumerate(cropped, 1):
+            r = results.get(i)
+            if r is None:
+                unresolved.append((u, crop_path))
+            elif not r.get("readable", False):
+                unreadable.append((u, crop_path))
+            else:
+                finding = r.get("finding", "")
+                correction = str(r.get("correction") or "none")
+                if correction.lower() != "none":
+                    u.resolution = f"{finding} → Correction: {correction}"
+                else:
+                    u.resolution = f"{finding} (draft was correct)"
+
+        # 読めなかったものは enhance してまとめて再トライ
+        if unreadable:
+            unresolved.extend(self._check_with_enhancement_batch(unreadable))
+        return unresolved
+
+    def _check_with_enhancement_batch(
+        self, items: list[tuple[UncertainPoint, str]]
+    ) -> list[tuple[UncertainPoint, str]]:
+        """_check_with_enhancement のバッチ版。回答が欠けた点を (点, crop画像のパス) で返す"""
+        logger.info(f"      🔧 Enhancing {len(items)} crops for better readability...")
+
+        enhanced = []
+        enhanced_paths: dict[str, str] = {}  # 同じcropは1回だけ enhance する
+        for u, crop_path in items:
+            enhanced_path = enhanced_paths.get(crop_path)
+            if enhanced_path is None:
+                enhanced_path = enhanced_paths[crop_path] = ImageProcessor.preprocess_image.invoke({
+                    "image_path": crop_path,
+                    "method": "edge_enhancement"
+                })
+            if isinstance(enhanced_path, str) and enhanced_path.startswith("Error"):
+                u.resolution = f"Enhancement failed: {enhanced_path}"
+            else:
+                enhanced.append((u, crop_path, enhanced_path))
+        if not enhanced:
+            return []
+
+        content = []
+        for i, (u, _, enhanced_path) in enumerate(enhanced, 1):
+            content.append({"type": "text", "text": f"Crop {i} ({u.id}) — Question: {u.description}"})
+            content.extend(self._load_image(enhanced_path))
+
+        response = self.llm.invoke([
+            SystemMessage(content="""These are ENHANCED versions of flowchart crops.
+Lines and text have been thickened for readability.
+Each crop is preceded by a line "Crop <n> (<id>) — Question: ...".
+
+Look carefully and answer for EACH crop:
+{
+  "results": [
+    {"crop": 1, "finding": "<what you can see>", "correction": "<change needed, or 'none'>"}
+  ]
+}
+"""),
+            HumanMessage(content=content)
+        ])
+
+        try:
+            results = self._index_batch_results(response.content)
+        except Exception:
+            for u, _, _ in enhanced:
+                u.resolution = f"(after enhancement) {response.content[:200]}"
+            return []
+
+        unresolved = []
+        for i, (u, crop_path, _) in enumerate(enhanced, 1):
+            r = results.get(i)
+            if r is None:
+                unresolved.append((u, crop_path))
+                continue
+            finding = r.get("finding", "unclear even after enhancement")
+            correction = str(r.get("correction") or "none")
+            if correction.lower() != "none":
+                u.resolution = f"(after enhancement) {finding} → Correction: {correction}"
+            else:
+                u.resolution = f"(after enhancement) {finding}"
+        return unresolved
+
+    def _index_batch_results(self, text: str) -> dict[int, dict]:
+        """バッチ応答の results 配列を crop 番号 → 結果 の dict にする"""
+        data = self._parse_json(text)
+        items = data.get("results", []) if isinstance(data, dict) else data
+        indexed = {}
+        for r in items:
+            if isinstance(r, dict):
+                try:
+                    indexed[int(r["crop"])] = r
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return indexed
+
+    def _check_uncertain_point(
+        self, image_path: str, img_w: int, img_h: int,
+        point: UncertainPoint, current_mermaid: str, crop_path: str | None = None
+    ) -> str:
+        """1つの不確実箇所をcropで確認し、結論を返す（crop_path があればそのcropを使う）"""
+
+        # Step 1: 通常cropで確認
+        if crop_path is None:
+            crop_path = self._crop_uncertain_point(image_path, img_w, img_h, point)
+
         if isinstance(crop_path, str) and crop_path.startswith("Error"):
             return f"Could not crop: {crop_path}"
 
@@ -542,11 +805,7 @@ Look carefully and answer:
 
     def _load_image(self, path: str) -> list:
         try:
-            with open(path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("utf-8")
-            ext = Path(path).suffix.lower()
-            mime = "image/png" if ext == ".png" else "image/jpeg"
-            return [{"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}}]
+            return list(_load_image_cached(path, os.path.getmtime(path)))
         except Exception as e:
             return [{"type": "text", "text": f"[Error: {e}]"}]
 
@@ -561,11 +820,10 @@ Look carefully and answer:
 
     def _parse_json(self, text: str):
         text = text.strip()
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-        return json.loads(text.strip())
+        m = _JSON_FENCE_RE.search(text) or _ANY_FENCE_RE.search(text)
+        if m:
+            text = m.group(1)
+        return _json_loads(text.strip())
 
     @staticmethod
     def _clamp(val, lo, hi):
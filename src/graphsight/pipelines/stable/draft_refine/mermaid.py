@@ -1,4 +1,7 @@
 import re
+import sys
+from functools import lru_cache
+
 from loguru import logger
 from .models import (
     GraphStructure,
@@ -7,6 +10,129 @@ from .models import (
 )
 
 
+# _preprocess_line の正規化ルール (パターン, 置換)。適用順序が重要
+_PREPROCESS_SUBS = [
+    # --|label| --> を -->|label| に変換
+    (re.compile(r'\s*--\|(.+?)\|\s*-->'), r' -->|\1|'),
+    # --|label| --- を ---|label| に変換
+    (re.compile(r'\s*--\|(.+?)\|\s*---'), r' ---|\1|'),
+    # --|label| -.-> を -.->|label| に変換
+    (re.compile(r'\s*--\|(.+?)\|\s*-\.->'), r' -.->|\1|'),
+    # --|label| ==> を ==>|label| に変換
+    (re.compile(r'\s*--\|(.+?)\|\s*==>'), r' ==>|\1|'),
+    # --|label| (矢印なし、次がノード) を ---|label| に変換
+    (re.compile(r'\s*--\|(.+?)\|\s+(?!-->|---|-\.->|==>|===)'), r' ---|\1| '),
+]
+
+_DIRECTION_RE = re.compile(r'^(?:graph|flowchart)\s+(TD|TB|LR|RL|BT)')
+
+# 閉じカッコ欠損ノード: 開始カッコのパターン ([ Or (( Or {{ Or { Or [ Or (
+_HEURISTIC_NODE_RE = re.compile(r'^([A-Za-z_]\w*)\s*(\(\[|\(\(|\{\{|\{|\[|\()((?:.|\\n)*)')
+_TRAILING_BRACKET_RE = re.compile(r'(\]\)|\]|\)\)|\}|\}\})$')
+# 閉じカッコ欠損ノードの開始カッコ → 形状
+_OPEN_BRACKET_SHAPES = {
+    "([": "stadium", "((": "circle", "{{": "hex",
+    "{": "diamond", "[": "rect", "(": "round",
+}
+_BARE_ID_RE = re.compile(r'^([A-Za-z_]\w*)$')
+_PARTIAL_ID_RE = re.compile(r'^([A-Za-z_]\w*)\s*--')
+_UNSAFE_ID_CHARS_RE = re.compile(r'[^A-Za-z0-9_]')
+
+# ノードラベル ("...", [...], (...), {...}) の範囲。カッコ内のクォートはひとまとまりとして読み飛ばす。
+# 閉じカッコ欠損のラベルはマッチしない (その行はマスクされず、従来どおりの分割になる)。
+# 同じ種類のカッコは中に含めないので、"A[x --> B[y]" の欠損ラベルが後ろのラベルまで呑み込むことはない
+_LABEL_SPAN_RE = re.compile(
+    r'"[^"]*"'
+    r'|\[(?:"[^"]*"|[^\[\]"])*\]'
+    r'|\((?:"[^"]*"|[^()"])*\)'
+    r'|\{(?:"[^"]*"|[^{}"])*\}'
+)
+
+
+def _blank_label(m: re.Match) -> str:
+    s = m.group()
+    return s[0] + '_' * (len(s) - 2) + s[-1]
+
+
+def _mask_labels(line: str) -> str:
+    """ノードラベルの中身を同じ長さの '_' に置き換えた行を返す。
+
+    矢印の検出はマスク済みの行で行い、切り出しは元の行から同じ位置で行う。
+    これで J["x --> y"] ==> C のようにラベル内に矢印があってもラベルの外の矢印だけで分割される。
+    """
+    return _LABEL_SPAN_RE.sub(_blank_label, line)
+
+
+class _LineLexer:
+    """エッジ行を1回の走査で TEXT / ARROW / PIPE_LABEL トークン列に分解する手書きの字句解析器。
+
+    矢印の判定は MermaidParser.ARROW_PATTERNS と同じ (どの位置でも最左の矢印を採る)。
+    矢印は _mask_labels 済みの行から探し (ラベル内の矢印は無視)、TEXT / PIPE_LABEL は元の行から切り出す。
+    """
+
+    TEXT = "TEXT"
+    ARROW = "ARROW"
+    PIPE_LABEL = "PIPE_LABEL"
+
+    # MermaidParser.ARROW_PATTERNS と同じ矢印 (同じ位置で重なる組み合わせは無い)
+    ARROWS = ("-.->", "===", "==>", "-->", "---")
+
+    def __init__(self, src: str, masked: str | None = None):
+        self.src = src
+        self.masked = src if masked is None else masked
+        self.pos = 0
+
+    def tokens(self) -> list[tuple[str, str]]:
+        src = self.src
+        out = []
+        text_start = 0
+        while True:
+            cand = self._next_arrow_candidate()
+            if cand < 0:
+                break
+            arrow = self._read_arrow(cand)
+            if arrow is None:
+                self.pos = cand + 1
+                continue
+            out.append((self.TEXT, src[text_start:cand]))
+            out.append((self.ARROW, arrow))
+            label = self._read_pipe_label()
+            if label is not None:
+                out.append((self.PIPE_LABEL, label))
+            text_start = self.pos
+        out.append((self.TEXT, src[text_start:]))
+        return out
+
+    def _next_arrow_candidate(self) -> int:
+        """矢印の先頭になり得る '-' / '=' の次の位置 (無ければ -1)"""
+        dash = self.masked.find('-', self.pos)
+        eq = self.masked.find('=', self.pos)
+        if dash < 0 or eq < 0:
+            return max(dash, eq)
+        return min(dash, eq)
+
+    def _read_arrow(self, pos: int) -> str | None:
+        for arrow in self.ARROWS:
+            if self.masked.startswith(arrow, pos):
+                self.pos = pos + len(arrow)
+                return arrow
+        return None
+
+    def _read_pipe_label(self) -> str | None:
+        """矢印直後の |label| を読む (正規表現 \\s*\\|(.+?)\\| 相当)。無ければ位置を戻さず None"""
+        src = self.src
+        p = self.pos
+        while p < len(src) and src[p].isspace():
+            p += 1
+        if p >= len(src) or src[p] != '|':
+            return None
+        close = src.find('|', p + 2)
+        if close < 0:
+            return None
+        self.pos = close + 1
+        return src[p + 1:close]
+
+
 class MermaidParser:
     """LLMが出力する典型的なMermaid構文をパースしてGraphStructureに変換する"""
 
@@ -29,6 +155,19 @@ class MermaidParser:
         (r'---',    '---'),
     ]
 
+    # 上記を1本の選択 (alternation) にまとめたコンパイル済みパターン（クラス定義時に1回だけコンパイル）
+    # 矢印はリテラルなので、マッチした文字列 (group 'arrow') がそのまま style になる
+    _ARROW_CHOICES = '|'.join(arrow_re for arrow_re, _ in ARROW_PATTERNS)
+    _ARROW_ALT = '(?P<arrow>' + _ARROW_CHOICES + ')'
+    _ARROW_RE = re.compile(_ARROW_ALT)
+    _CHAIN_SPLIT_RE = re.compile(r'\s*' + _ARROW_ALT + r'\s*')
+
+    # ID + 形状。group 1 が ID、group 2 以降が SHAPE_PATTERNS の順に各形状のラベル
+    _NODE_SHAPE_RE = re.compile(
+        r'^([A-Za-z_]\w*)\s*(?:' + '|'.join(pattern for pattern, _ in SHAPE_PATTERNS) + r')$'
+    )
+    _SHAPE_NAMES = tuple(shape for _, shape in SHAPE_PATTERNS)
+
     @classmethod
     def _preprocess_line(cls, line: str) -> str:
         """LLMが出力する非標準なエッジ構文を標準形に正規化する。
@@ -41,16 +180,11 @@ class MermaidParser:
           D -->|開示も求める| E
           D ---|Yes| E
         """
-        # --|label| --> を -->|label| に変換
-        line = re.sub(r'\s*--\|(.+?)\|\s*-->', r' -->|\1|', line)
-        # --|label| --- を ---|label| に変換
-        line = re.sub(r'\s*--\|(.+?)\|\s*---', r' ---|\1|', line)
-        # --|label| -.-> を -.->|label| に変換
-        line = re.sub(r'\s*--\|(.+?)\|\s*-\.->',r' -.->|\1|', line)
-        # --|label| ==> を ==>|label| に変換
-        line = re.sub(r'\s*--\|(.+?)\|\s*==>', r' ==>|\1|', line)
-        # --|label| (矢印なし、次がノード) を ---|label| に変換
-        line = re.sub(r'\s*--\|(.+?)\|\s+(?!-->|---|-\.->|==>|===)', r' ---|\1| ', line)
+        # どの規則も "--|" を含む行にしか効かない。大半の行はここで素通しする
+        if '--|' not in line:
+            return line
+        for pattern, repl in _PREPROCESS_SUBS:
+            line = pattern.sub(repl, line)
         return line
 
     @classmethod
@@ -68,14 +202,8 @@ class MermaidParser:
             if not stripped or stripped.startswith("%%"):
                 continue
 
-            # graph direction
-            m = re.match(r'^graph\s+(TD|TB|LR|RL|BT)', stripped)
-            if m:
-                graph.direction = m.group(1)
-                continue
-
-            # flowchart direction (flowchart キーワードもサポート)
-            m = re.match(r'^flowchart\s+(TD|TB|LR|RL|BT)', stripped)
+            # graph / flowchart direction
+            m = _DIRECTION_RE.match(stripped)
             if m:
                 graph.direction = m.group(1)
                 continue
@@ -103,19 +231,36 @@ class MermaidParser:
 
         return graph
 
-    # Mermaidのインラインラベル構文: "A -- text --> B", "A -- text --- B"
-    # "--" の後にラベルテキストがあり、その後に矢印本体が来る
-    INLINE_LABEL_PATTERNS = [
-        # -- text --> (arrow)
-        (r'^(.+?)\s+--\s+(.+?)\s+-->\s+(.+)$',  '-->'),
-        # -- text --- (line)
-        (r'^(.+?)\s+--\s+(.+?)\s+---\s+(.+)$',   '---'),
-        # -- text -.-> (dotted arrow)
-        (r'^(.+?)\s+--\s+(.+?)\s+-\.->+\s+(.+)$', '-.->'),
-        # -- text ==> (thick arrow)
-        (r'^(.+?)\s+--\s+(.+?)\s+==>\s+(.+)$',   '==>'),
+    # インラインラベル構文 "A -- text --> B" の矢印 (正規表現, style)。矢印の種類ごとに分岐を分け、この順に試す。
+    # 1本の選択 (-->|---|...) にするとラベルが最初の矢印で切れてしまうため
+    # ("A -- x --- y --> B" は "-->" の分岐で label="x --- y" になる)
+    INLINE_ARROWS = [
+        (r'-->',    '-->'),
+        (r'---',    '---'),
+        (r'-\.->+', '-.->'),  # "-.->>" のような余分な ">" は点線矢印として正規化
+        (r'==>',    '==>'),
     ]
 
+    # エッジ行の3構文を優先順に並べた1本の選択パターン。fullmatch は分岐を左から順に
+    # 試すので、構文ごとに fullmatch を呼ぶのと同じ結果を1回の呼び出しで得られる。
+    # どの分岐でマッチしたかは m.lastgroup (各分岐の最後のグループ名) で判別する
+    _EDGE_RE = re.compile(
+        # 1. インラインラベル構文: "A -- text --> B", "A -- text --- B"
+        #    "--" の後にラベルテキストがあり、その後に矢印本体が来る
+        '|'.join(
+            rf'(?P<i{i}_src>.+?)\s+--\s+(?P<i{i}_label>.+?)\s+{arrow_re}\s+(?P<i{i}_dst>.+)'
+            for i, (arrow_re, _) in enumerate(INLINE_ARROWS)
+        )
+        # 2. パイプ構文: "A -->|label| B"
+        + r'|(?P<p_src>.+?)\s*(?P<p_arrow>' + _ARROW_CHOICES + r')\s*\|(?P<p_label>.+?)\|\s*(?P<p_dst>.+)'
+        # 3. ラベルなし: "A --> B"
+        + r'|(?P<l_src>.+?)\s*(?P<l_arrow>' + _ARROW_CHOICES + r')\s*(?P<l_dst>.+)'
+    )
+    # インラインラベル分岐の最後のグループ名 → (グループ名の接頭辞, style)
+    _INLINE_BRANCHES = {
+        f'i{i}_dst': (f'i{i}_', style) for i, (_, style) in enumerate(INLINE_ARROWS)
+    }
+
     @classmethod
     def _try_parse_edge(cls, line: str, graph: GraphStructure, fallback_events: list) -> bool:
         """エッジ行をパースする。3つの構文をサポート:
@@ -124,81 +269,122 @@ class MermaidParser:
         3. A --> B             (ラベルなし)
         """
 
-        # --- 1. インラインラベル構文を最優先で試す ---
-        # "A -- text --> B" を先にマッチしないと、
-        # "-->" だけが矢印として認識され "A -- text" がノード化してしまう
-        for pattern, arrow_style in cls.INLINE_LABEL_PATTERNS:
-            m = re.match(pattern, line)
-            if m:
-                src = cls._parse_node_ref(m.group(1).strip(), graph, fallback_events)
-                edge_label = m.group(2).strip()
-                dst = cls._parse_node_ref(m.group(3).strip(), graph, fallback_events)
+        # --- 0. 字句解析による高速パス ---
+        # 素直な行 (A --> B, A -->|label| B, A --> B --> C) は正規表現を使わずに確定する
+        masked = _mask_labels(line)
+        simple = cls._split_simple_edge_line(_LineLexer(line, masked).tokens())
+        if simple is not None:
+            parts, arrows, edge_label = simple
+            if not arrows:
+                return False
+            node_ids = [cls._parse_node_ref(p, graph, fallback_events) for p in parts]
+            for i, style in enumerate(arrows):
                 graph.edges.append(Edge(
-                    src=src, dst=dst, label=edge_label, style=arrow_style
+                    src=node_ids[i], dst=node_ids[i + 1], label=edge_label, style=style
                 ))
-                return True
+            return True
 
-        # --- 2. パイプ構文: A -->|label| B ---
-        for arrow_re, arrow_style in cls.ARROW_PATTERNS:
-            pattern = rf'^(.+?)\s*{arrow_re}\s*\|(.+?)\|\s*(.+)$'
-            m = re.match(pattern, line)
-            if m:
-                src = cls._parse_node_ref(m.group(1).strip(), graph, fallback_events)
-                edge_label = m.group(2).strip()
-                dst = cls._parse_node_ref(m.group(3).strip(), graph, fallback_events)
-                graph.edges.append(Edge(
-                    src=src, dst=dst, label=edge_label, style=arrow_style
-                ))
-                return True
+        return cls._try_parse_edge_regex(line, graph, fallback_events, masked)
 
-        # --- 3. ラベルなし: A --> B ---
-        for arrow_re, arrow_style in cls.ARROW_PATTERNS:
-            pattern = rf'^(.+?)\s*{arrow_re}\s*(.+)$'
-            m = re.match(pattern, line)
-            if m:
-                src_text = m.group(1).strip()
-                dst_text = m.group(2).strip()
-                # src OR dst にまだ矢印が含まれている場合はチェーン行
-                if cls._contains_arrow(src_text) or cls._contains_arrow(dst_text):
-                    return cls._parse_chained_edges(line, graph, fallback_events)
-                src = cls._parse_node_ref(src_text, graph, fallback_events)
-                dst = cls._parse_node_ref(dst_text, graph, fallback_events)
-                graph.edges.append(Edge(src=src, dst=dst, style=arrow_style))
-                return True
-
-        return False
+    @classmethod
+    def _try_parse_edge_regex(cls, line: str, graph: GraphStructure, fallback_events: list,
+                              masked: str | None = None) -> bool:
+        """正規表現による解析。字句解析の高速パスで確定しなかった行を受け持つ (どの行にも使える)"""
+        if masked is None:
+            masked = _mask_labels(line)
+
+        # --- 1〜3. 正規表現1回で構文を判別 ---
+        # マッチはマスク済みの行で行い、各部分は元の行の同じ位置から切り出す
+        m = cls._EDGE_RE.fullmatch(masked)
+        if m is None:
+            return False
+
+        def group(name: str) -> str:
+            return line[m.start(name):m.end(name)]
+
+        inline = cls._INLINE_BRANCHES.get(m.lastgroup)
+        if inline is not None:
+            # インラインラベル構文は最優先の分岐。
+            # 先にマッチしないと "-->" だけが矢印として認識され "A -- text" がノード化してしまう
+            prefix, arrow_style = inline
+            src = cls._parse_node_ref(group(prefix + 'src').strip(), graph, fallback_events)
+            edge_label = group(prefix + 'label').strip()
+            dst = cls._parse_node_ref(group(prefix + 'dst').strip(), graph, fallback_events)
+            graph.edges.append(Edge(
+                src=src, dst=dst, label=edge_label, style=arrow_style
+            ))
+            return True
+
+        if m.lastgroup == 'p_dst':
+            src = cls._parse_node_ref(group('p_src').strip(), graph, fallback_events)
+            edge_label = group('p_label').strip()
+            dst = cls._parse_node_ref(group('p_dst').strip(), graph, fallback_events)
+            graph.edges.append(Edge(
+                src=src, dst=dst, label=edge_label, style=m.group('p_arrow')
+            ))
+            return True
+
+        # src OR dst にまだ (ラベルの外に) 矢印が含まれている場合はチェーン行
+        if cls._contains_arrow(m.group('l_src')) or cls._contains_arrow(m.group('l_dst')):
+            return cls._parse_chained_edges(line, graph, fallback_events)
+        src = cls._parse_node_ref(group('l_src').strip(), graph, fallback_events)
+        dst = cls._parse_node_ref(group('l_dst').strip(), graph, fallback_events)
+        graph.edges.append(Edge(src=src, dst=dst, style=m.group('l_arrow')))
+        return True
+
+    @staticmethod
+    def _split_simple_edge_line(tokens: list[tuple[str, str]]) -> tuple[list[str], list[str], str] | None:
+        """トークン列が TEXT (ARROW [PIPE_LABEL] TEXT)* の素直な形なら (ノード部分, 矢印, ラベル) を返す。
+
+        インラインラベル (ラベルの外に "--" を含む)、パイプ付きのチェーン、空のノード部分など
+        正規表現版の優先順位に依存する行は None を返し、正規表現による解析に任せる。
+        """
+        parts = []
+        arrows = []
+        labels = []
+        for kind, value in tokens:
+            if kind == _LineLexer.TEXT:
+                part = value.strip()
+                if not part:
+                    return None
+                # ラベルは矢印をまたがないので、ノード部分ごとにマスクしてもラベルの中身だけが消える
+                if '--' in part or '|' in part:
+                    masked_part = _mask_labels(part)
+                    if '--' in masked_part or '|' in masked_part:
+                        return None
+                parts.append(part)
+            elif kind == _LineLexer.ARROW:
+                arrows.append(value)
+            else:
+                labels.append(value.strip())
+        if labels and len(arrows) > 1:
+            return None
+        return parts, arrows, labels[0] if labels else ""
 
     @classmethod
     def _contains_arrow(cls, text: str) -> bool:
         """テキスト内に矢印パターンが含まれているか"""
-        for arrow_re, _ in cls.ARROW_PATTERNS:
-            if re.search(arrow_re, text):
-                return True
-        return False
+        # どの矢印も "--" / "==" / "-." のいずれかを含む。大半のノード参照はここで確定する
+        if '--' not in text and '==' not in text and '-.' not in text:
+            return False
+        return cls._ARROW_RE.search(text) is not None
 
     @classmethod
     def _parse_chained_edges(cls, line: str, graph: GraphStructure, fallback_events: list | None = None) -> bool:
         """A --> B --> C のようなチェーンを複数エッジに分解する"""
-        # 矢印で分割
+        # 矢印で分割（マスク済みの行を1回走査し、元の行をマッチ位置で直接切り出す）
         parts = []
         arrows = []
-        remaining = line
-        while remaining:
-            matched = False
-            for arrow_re, arrow_style in cls.ARROW_PATTERNS:
-                m = re.search(rf'\s*{arrow_re}\s*', remaining)
-                if m:
-                    part = remaining[:m.start()].strip()
-                    if part:
-                        parts.append(part)
-                        arrows.append(arrow_style)
-                    remaining = remaining[m.end():]
-                    matched = True
-                    break
-            if not matched:
-                if remaining.strip():
-                    parts.append(remaining.strip())
-                break
+        prev = 0
+        for m in cls._CHAIN_SPLIT_RE.finditer(_mask_labels(line)):
+            part = line[prev:m.start()].strip()
+            if part:
+                parts.append(part)
+                arrows.append(m.group('arrow'))
+            prev = m.end()
+        tail = line[prev:].strip()
+        if tail:
+            parts.append(tail)
 
         if len(parts) < 2:
             return False
@@ -214,36 +400,52 @@ class MermaidParser:
     @classmethod
     def _parse_node_ref(cls, text: str, graph: GraphStructure, fallback_events: list = None) -> str:
         """'A[Some Label]' → ノード登録してIDを返す。'A' だけなら既存参照。"""
-        
+        nid, label, shape, is_fallback = cls._match_node_ref(text)
+        if is_fallback and fallback_events is not None:
+            fallback_events.append(text)
+        if nid not in graph.nodes:
+            graph.nodes[nid] = Node(id=nid, label=label, shape=shape)
+        return nid
+
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def _match_node_ref(cls, text: str) -> tuple[str, str, str, bool]:
+        """ノード参照テキストを (ID, ラベル, 形状, フォールバックか) に解釈する。
+
+        text だけで決まる純粋関数なのでキャッシュする（同じ参照は1つの図の中で何度も現れる）。
+        グラフへの登録は呼び出し側で行う。
+        ID は sys.intern して、nodes の dict と各 Edge の src/dst で同じ文字列を共有する。
+        """
+        # 0. 素のID ("A", "node_1") が最頻出。ASCII識別子なら正規表現を使わずに確定する
+        #    (isidentifier だけだと非ASCII識別子も通るので isascii で _BARE_ID_RE の範囲に絞る)
+        stripped = text.strip()
+        if stripped.isascii() and stripped.isidentifier():
+            return sys.intern(stripped), stripped, "rect", False
+
         # 1. Strict Parsing (厳密な正規表現: 閉じカッコあり)
-        for pattern, shape in cls.SHAPE_PATTERNS:
-            # 改行またぎ対応の正規表現 ((?:.|\\n)+?) を使用
-            m = re.match(rf'^([A-Za-z_]\w*)\s*' + pattern + r'$', text)
-            if m:
-                nid = m.group(1)
-                raw_label = m.group(2).strip()
-                # クォート除去 ("label" -> label)
-                if (raw_label.startswith('"') and raw_label.endswith('"')) or \
-                   (raw_label.startswith("'") and raw_label.endswith("'")):
-                    label = raw_label[1:-1]
-                else:
-                    label = raw_label
-                
-                if nid not in graph.nodes:
-                    graph.nodes[nid] = Node(id=nid, label=label, shape=shape)
-                return nid
+        # 改行またぎ対応の正規表現 ((?:.|\\n)+?) を使用
+        m = cls._NODE_SHAPE_RE.match(text)
+        if m:
+            shape = cls._SHAPE_NAMES[m.lastindex - 2]
+            raw_label = m.group(m.lastindex).strip()
+            # クォート除去 ("label" -> label)
+            if (raw_label.startswith('"') and raw_label.endswith('"')) or \
+               (raw_label.startswith("'") and raw_label.endswith("'")):
+                label = raw_label[1:-1]
+            else:
+                label = raw_label
+            return sys.intern(m.group(1)), label, shape, False
 
         # 2. Heuristic Parsing (救済措置: 閉じカッコ欠損/改行分割への対応)
         # 例: "R[電話会社に" (ここで改行されて切れている)
-        # 開始カッコのパターン: ([Or (( Or {{ Or { Or [ Or (
-        heuristic_match = re.match(r'^([A-Za-z_]\w*)\s*(\(\[|\(\(|\{\{|\{|\[|\()((?:.|\\n)*)', text)
+        heuristic_match = _HEURISTIC_NODE_RE.match(text)
         if heuristic_match:
             nid = heuristic_match.group(1)
             bracket = heuristic_match.group(2)
             raw_content = heuristic_match.group(3).strip()
-            
+
             # 末尾のゴミ（閉じカッコの断片など）があれば除去
-            label = re.sub(r'(\]\)|\]|\)\)|\}|\}\})$', '', raw_content)
+            label = _TRAILING_BRACKET_RE.sub('', raw_content)
 
             # クォート除去
             if (label.startswith('"') and label.endswith('"')) or \
@@ -251,55 +453,32 @@ class MermaidParser:
                 label = label[1:-1]
 
             # 開始カッコから形状を決定
-            shape_map = {
-                "([": "stadium", "((": "circle", "{{": "hex", 
-                "{": "diamond", "[": "rect", "(": "round"
-            }
-            shape = shape_map.get(bracket, "rect")
-            
-            if nid not in graph.nodes:
-                # ログで救済を通知（デバッグ用）
-                # logger.debug(f"🔧 Heuristically parsed node: {nid}[{label}...] (incomplete line)")
-                graph.nodes[nid] = Node(id=nid, label=label, shape=shape)
-            return nid
+            return sys.intern(nid), label, _OPEN_BRACKET_SHAPES.get(bracket, "rect"), False
 
         # 3. IDのみ (形状なし)
-        m = re.match(r'^([A-Za-z_]\w*)$', text.strip())
+        m = _BARE_ID_RE.match(text.strip())
         if m:
-            nid = m.group(1)
-            if nid not in graph.nodes:
-                graph.nodes[nid] = Node(id=nid, label=nid, shape="rect")
-            return nid
+            return sys.intern(m.group(1)), m.group(1), "rect", False
 
         # エッジラベル残骸処理 (例: "E -- text")
-        m = re.match(r'^([A-Za-z_]\w*)\s*--', text)
+        m = _PARTIAL_ID_RE.match(text)
         if m:
-            nid = m.group(1)
-            if nid not in graph.nodes:
-                graph.nodes[nid] = Node(id=nid, label=nid, shape="rect")
-            return nid
+            return sys.intern(m.group(1)), m.group(1), "rect", False
 
         # 4. Fallback (最終手段: 強制ID化)
-        if fallback_events is not None:
-            fallback_events.append(text)
-
-        safe_id = re.sub(r'[^A-Za-z0-9_]', '_', text)[:20]
+        safe_id = _UNSAFE_ID_CHARS_RE.sub('_', text)[:20]
         if not safe_id or safe_id[0].isdigit():
             safe_id = "N_" + safe_id
-        if safe_id not in graph.nodes:
-            graph.nodes[safe_id] = Node(id=safe_id, label=text, shape="rect")
-        return safe_id
+        return sys.intern(safe_id), text, "rect", True
 
     @classmethod
     def _try_parse_standalone_node(cls, line: str, graph: GraphStructure):
         """単独のノード宣言行をパース"""
-        for pattern, shape in cls.SHAPE_PATTERNS:
-            m = re.match(rf'^([A-Za-z_]\w*)\s*' + pattern + r'$', line)
-            if m:
-                nid = m.group(1)
-                label = m.group(2).strip()
-                if nid not in graph.nodes:
-                    graph.nodes[nid] = Node(id=nid, label=label, shape=shape)
-                return
+        m = cls._NODE_SHAPE_RE.match(line)
+        if m:
+            nid = m.group(1)
+            label = m.group(m.lastindex).strip()
+            if nid not in graph.nodes:
+                graph.nodes[nid] = Node(id=nid, label=label, shape=cls._SHAPE_NAMES[m.lastindex - 2])
 
 
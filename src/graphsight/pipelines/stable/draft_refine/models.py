@@ -51,6 +51,17 @@ class GraphStructure(BaseModel):
             edges=schema.edges
         )
 
+    def clone(self) -> "GraphStructure":
+        """グラフの複製を返す。
+
+        Node / Edge のフィールドは不変な値 (str / None) だけなので、要素ごとの浅いコピーで
+        deepcopy と同等になる（汎用の deepcopy より数倍速い）。
+        """
+        return self.model_copy(update={
+            "nodes": {nid: n.model_copy() for nid, n in self.nodes.items()},
+            "edges": [e.model_copy() for e in self.edges],
+        })
+
     def diff(self, other: "GraphStructure") -> "GraphDiff":
         """2つのグラフの構造差分を返す"""
         d = GraphDiff()
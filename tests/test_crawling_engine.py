@@ -0,0 +1,171 @@
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from graphsight.pipelines.experimental.crawling.engine import GraphInterpreter, LogicGraph, StepIndex
+from graphsight.pipelines.experimental.crawling.models import (
+    ConnectedNode,
+    IncomingConnection,
+    StepInterpretation,
+    TokenUsage,
+)
+
+IDS = ["A", "B", "C", "D", "E", "F"]
+
+
+def _edge(target_id: str) -> ConnectedNode:
+    return ConnectedNode(target_id=target_id, description=target_id)
+
+
+def _random_step(rng: random.Random, source_id: str) -> StepInterpretation:
+    return StepInterpretation(
+        source_id=source_id,
+        outgoing_edges=[_edge(t) for t in rng.sample(IDS, rng.randint(0, 3))],
+        incoming_edges=[IncomingConnection(direction="Top") for _ in range(rng.randint(0, 2))],
+        audit_confirmed_incoming=rng.choice([None, rng.sample(IDS, rng.randint(0, 2))]),
+    )
+
+
+def _random_strategy(rng: random.Random) -> MagicMock:
+    """監査結果を乱数で返すモック戦略。存在しないIDを返して新規ノードの作成も起こす"""
+    def audit_nodes_batch(vlm, image_path, focuses, context_history, proposed_ins, proposed_outs):
+        pool = IDS + ["G", "node_h"]
+        results = [
+            StepInterpretation(
+                outgoing_edges=[],
+                audit_confirmed_incoming=rng.choice([None, rng.sample(pool, rng.randint(0, 2))]),
+                audit_confirmed_outgoing=rng.choice([None, rng.sample(IDS, rng.randint(0, 3))]),
+            )
+            for _ in focuses
+        ]
+        return results, TokenUsage()
+
+    strategy = MagicMock()
+    strategy.audit_nodes_batch.side_effect = audit_nodes_batch
+    return strategy
+
+
+def _task_key(tasks):
+    return [(t.idx, t.step.source_id, sorted(t.proposed_in), sorted(t.proposed_out), t.reasons) for t in tasks]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_dirty_tracking_matches_full_rebuild(seed):
+    """追加と修正を交互に行っても、差分更新したグラフでの判定は毎回作り直した場合と一致する"""
+    rng = random.Random(seed)
+    engine = GraphInterpreter(MagicMock(), max_concurrency=1)
+    strategy = _random_strategy(rng)
+
+    history = [_random_step(rng, rng.choice(IDS)) for _ in range(6)]
+    index = StepIndex(history)
+    graph = LogicGraph(history)
+
+    for _ in range(8):
+        tasks = engine._find_inconsistencies(history, graph)
+        assert _task_key(tasks) == _task_key(engine._find_inconsistencies(history))
+
+        # 修正 (監査結果によるパッチ) と、クロールでの追加を交互に行う
+        engine._audit_cache.clear()
+        engine._execute_fix_batch("img.png", strategy, history, tasks, index, graph)
+        if rng.random() < 0.5:
+            step = _random_step(rng, rng.choice(IDS))
+            history.append(step)
+            index.add(step)
+            graph.add_step(step)
+
+    assert _task_key(engine._find_inconsistencies(history, graph)) == _task_key(engine._find_inconsistencies(history))
+
+
+def test_logic_graph_edge_counts():
+    """同じ (src, dst) のエッジが複数あれば、全て消えるまで in/out に残る"""
+    history = [
+        StepInterpretation(source_id="A", outgoing_edges=[_edge("B")]),
+        StepInterpretation(source_id="A", outgoing_edges=[_edge("B")]),
+    ]
+    graph = LogicGraph(history)
+    graph.dirty.clear()
+
+    graph.remove_edge("A", "B")
+    assert graph.outs["A"] == {"B"} and graph.ins["B"] == {"A"}
+    assert graph.dirty == {"A", "B"}
+
+    graph.remove_edge("A", "B")
+    assert graph.outs["A"] == set() and graph.ins["B"] == set()
+
+
+# クロール用のモック図: ノードID -> 接続先。合流・分岐・閉路を含む
+CRAWL_GRAPH = {
+    "A": ["B", "C"],
+    "B": ["D"],
+    "C": ["D", "E"],
+    "D": ["F", "A"],
+    "E": ["F", "D"],
+    "F": [],
+    "G": ["E"],
+}
+CRAWL_BBOX = {nid: [i * 100, 0, i * 100 + 50, 50] for i, nid in enumerate(CRAWL_GRAPH)}
+# 先に投げたノードほど遅く返るようにして、完了順と投入順をずらす
+CRAWL_DELAY = {nid: 0.002 * (len(CRAWL_GRAPH) - i) for i, nid in enumerate(CRAWL_GRAPH)}
+
+
+def _crawl_strategy() -> MagicMock:
+    """接続先が CRAWL_GRAPH だけで決まる (文脈に依存しない) モック戦略"""
+    import time
+    from graphsight.pipelines.experimental.crawling.models import Focus
+
+    def find_initial_focus(vlm, image_path):
+        return [
+            Focus(description=nid, suggested_id=nid, bbox=CRAWL_BBOX[nid]) for nid in ("A", "G")
+        ], TokenUsage()
+
+    def interpret_step(vlm, image_path, current_focus, context_history):
+        time.sleep(CRAWL_DELAY[current_focus.suggested_id])
+        edges = [
+            ConnectedNode(target_id=t, description=t, bbox=CRAWL_BBOX[t])
+            for t in CRAWL_GRAPH[current_focus.suggested_id]
+        ]
+        return StepInterpretation(outgoing_edges=edges), TokenUsage(input_tokens=1)
+
+    strategy = MagicMock()
+    strategy.find_initial_focus.side_effect = find_initial_focus
+    strategy.interpret_step.side_effect = interpret_step
+    return strategy
+
+
+def _run_crawl(mode: str, **kwargs):
+    from graphsight.pipelines.experimental.crawling.engine import NodeRegistry
+
+    engine = GraphInterpreter(MagicMock(), **kwargs)
+    strategy = _crawl_strategy()
+    history, usage = engine._crawl("img.png", strategy, NodeRegistry(mode="bbox"), mode, use_grid=False)
+    # interpret_step の呼び出し順はスレッドの開始順なので、順序は履歴 (取り込み順) で見る
+    calls = sorted(c.args[2].suggested_id for c in strategy.interpret_step.call_args_list)
+    graph = [(s.source_id, [e.target_id for e in s.outgoing_edges]) for s in history]
+    return calls, graph, usage
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"crawl_workers": 2},
+    {"crawl_workers": 4},
+    {"crawl_workers": 8},
+    {"crawl_prefetch": True},
+])
+def test_parallel_bfs_crawl_matches_sequential(kwargs):
+    """BFS では並列に投げても結果は投入順に取り込むので、逐次と同じ順序・同じグラフになる"""
+    seq_calls, seq_graph, seq_usage = _run_crawl("bfs")
+    calls, graph, usage = _run_crawl("bfs", **kwargs)
+
+    assert seq_calls == calls == sorted(CRAWL_GRAPH)  # 各ノードをちょうど1回ずつ解釈する
+    assert graph == seq_graph
+    assert usage == seq_usage
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_parallel_dfs_crawl_visits_each_node_once(workers):
+    """DFS の並列化は探索順が変わりうるが、訪問するノードと接続は逐次と同じで、重複訪問もない"""
+    seq_calls, seq_graph, _ = _run_crawl("dfs")
+    calls, graph, _ = _run_crawl("dfs", crawl_workers=workers)
+
+    assert seq_calls == calls == sorted(CRAWL_GRAPH)
+    assert sorted(graph) == sorted(seq_graph)
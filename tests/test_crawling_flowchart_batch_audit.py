@@ -0,0 +1,153 @@
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from graphsight.pipelines.experimental.crawling.models import (
+    BatchAuditResult,
+    ConnectionVerificationResult,
+    Focus,
+    NodeAudit,
+    StepInterpretation,
+    TokenUsage,
+)
+from graphsight.pipelines.experimental.crawling.strategies.flowchart import FlowchartStrategy
+
+
+@pytest.fixture
+def strategy():
+    return FlowchartStrategy()
+
+
+def _focuses(*ids):
+    return [Focus(description=f"node {nid}", suggested_id=nid) for nid in ids]
+
+
+def _vlm(batch_audits, single=None, connected=True):
+    """response_model ごとに応答を返すモック VLM。呼び出しはすべて call_args_list に残る"""
+    vlm = MagicMock()
+
+    def query_structured(prompt, image_path, response_model):
+        usage = TokenUsage(input_tokens=10, output_tokens=1)
+        if response_model is BatchAuditResult:
+            return BatchAuditResult(audits=batch_audits), usage
+        if response_model is StepInterpretation:
+            return single(prompt), usage
+        if response_model is ConnectionVerificationResult:
+            return ConnectionVerificationResult(is_connected=connected, reason="checked"), usage
+        raise AssertionError(f"unexpected response model {response_model}")
+
+    vlm.query_structured.side_effect = query_structured
+    return vlm
+
+
+def _models(vlm):
+    return [c.args[2] for c in vlm.query_structured.call_args_list]
+
+
+def test_batch_maps_verdicts_by_index(strategy):
+    """バッチ応答は index で対応付け、順序が入れ替わっていても focuses の順に返す"""
+    vlm = _vlm([
+        NodeAudit(index=2, audit_confirmed_outgoing=["A"]),
+        NodeAudit(index=0, audit_confirmed_outgoing=["B"], audit_notes="kept"),
+        NodeAudit(index=1, audit_confirmed_incoming=["A"]),
+    ])
+
+    results, usage = strategy.audit_nodes_batch(
+        vlm, "img.png", _focuses("A", "B", "C"), [], [[], ["A"], ["B"]], [["B"], ["C"], []]
+    )
+
+    assert [r.audit_confirmed_outgoing for r in results] == [["B"], None, ["A"]]
+    assert results[0].audit_notes == "kept"
+    assert results[1].audit_confirmed_incoming == ["A"]
+    assert _models(vlm) == [BatchAuditResult]
+    assert usage.input_tokens == 10
+
+
+def test_out_of_range_indices_are_ignored(strategy):
+    """範囲外の index は無視し、該当するノードの結果を上書きしない"""
+    vlm = _vlm([
+        NodeAudit(index=0, audit_confirmed_outgoing=["B"]),
+        NodeAudit(index=1, audit_confirmed_outgoing=[]),
+        NodeAudit(index=5, audit_confirmed_outgoing=["X"]),
+        NodeAudit(index=-1, audit_confirmed_outgoing=["Y"]),
+    ])
+
+    results, _ = strategy.audit_nodes_batch(
+        vlm, "img.png", _focuses("A", "B"), [], [[], []], [["B"], []]
+    )
+
+    assert [r.audit_confirmed_outgoing for r in results] == [["B"], []]
+    assert _models(vlm) == [BatchAuditResult]
+
+
+def test_partial_batch_falls_back_to_single_audit(strategy):
+    """回答が欠けたノードだけを audit_node で単体監査し直す"""
+    single = MagicMock(side_effect=lambda prompt: StepInterpretation(
+        outgoing_edges=[], audit_confirmed_outgoing=["C"], audit_notes="single"
+    ))
+    vlm = _vlm([
+        NodeAudit(index=0, audit_confirmed_outgoing=["B"]),
+        NodeAudit(index=7, audit_confirmed_outgoing=["Z"]),
+        NodeAudit(index=2, audit_confirmed_outgoing=[]),
+    ], single=single)
+
+    results, usage = strategy.audit_nodes_batch(
+        vlm, "img.png", _focuses("A", "B", "C"), [], [[], ["A"], ["B"]], [["B"], ["C"], []]
+    )
+
+    assert [r.audit_confirmed_outgoing for r in results] == [["B"], ["C"], []]
+    assert results[1].audit_notes == "single"
+    assert _models(vlm) == [BatchAuditResult, StepInterpretation]
+    # 単体監査は欠けたノード "B" についてのもの
+    assert '"B"' in single.call_args.args[0]
+    assert usage.input_tokens == 20
+
+
+def test_empty_batch_audits_every_node_alone(strategy):
+    single = MagicMock(side_effect=lambda prompt: StepInterpretation(outgoing_edges=[], audit_confirmed_outgoing=[]))
+    vlm = _vlm([], single=single)
+
+    results, _ = strategy.audit_nodes_batch(
+        vlm, "img.png", _focuses("A", "B"), [], [[], []], [[], []]
+    )
+
+    assert len(results) == 2
+    assert _models(vlm) == [BatchAuditResult, StepInterpretation, StepInterpretation]
+
+
+def test_single_focus_uses_audit_node(strategy):
+    """1ノードだけならバッチ用のプロンプトを使わず audit_node に任せる"""
+    single = MagicMock(side_effect=lambda prompt: StepInterpretation(outgoing_edges=[], audit_confirmed_outgoing=["B"]))
+    vlm = _vlm([], single=single)
+
+    results, _ = strategy.audit_nodes_batch(vlm, "img.png", _focuses("A"), [], [[]], [["B"]])
+
+    assert [r.audit_confirmed_outgoing for r in results] == [["B"]]
+    assert _models(vlm) == [StepInterpretation]
+
+
+def test_batch_verdicts_are_micro_verified(strategy, tmp_path):
+    """バッチで確定しかけた Outgoing もノードごとにクロップ検証され、否定されれば除かれる"""
+    image_path = str(tmp_path / "diagram.png")
+    Image.new("RGB", (400, 400), "white").save(image_path)
+    focuses = [
+        Focus(description="node A", suggested_id="A", bbox=[0, 0, 100, 100]),
+        Focus(description="node B", suggested_id="B", bbox=[200, 0, 300, 100]),
+    ]
+    history = [
+        StepInterpretation(outgoing_edges=[], source_id="A", source_bbox=[0, 0, 100, 100]),
+        StepInterpretation(outgoing_edges=[], source_id="B", source_bbox=[200, 0, 300, 100]),
+    ]
+    vlm = _vlm([
+        NodeAudit(index=0, audit_confirmed_outgoing=["B"]),
+        NodeAudit(index=1, audit_confirmed_outgoing=[]),
+    ], connected=False)
+
+    results, _ = strategy.audit_nodes_batch(vlm, image_path, focuses, history, [[], ["A"]], [["B"], []])
+
+    assert [r.audit_confirmed_outgoing for r in results] == [[], []]
+    assert "Rejected B" in results[0].audit_notes
+    assert _models(vlm) == [BatchAuditResult, ConnectionVerificationResult]
+    # クロップ画像は検証後に削除され、元画像は残る
+    assert [p.name for p in tmp_path.iterdir()] == ["diagram.png"]
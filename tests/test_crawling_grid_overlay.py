@@ -0,0 +1,52 @@
+import concurrent.futures
+import os
+
+from PIL import Image
+
+from graphsight.pipelines.experimental.crawling.utils.image import add_grid_overlay
+
+
+def _image(tmp_path, name="diagram.png", size=(400, 300)):
+    path = tmp_path / name
+    Image.new("RGB", size, "white").save(path)
+    return str(path)
+
+
+def test_no_cache_by_default(tmp_path, monkeypatch):
+    """cache_dir を渡さなければ元画像の隣に出力し、キャッシュ先には何も書かない"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    image_path = _image(tmp_path)
+
+    grid_path, rows, cols = add_grid_overlay(image_path, min_cell_size=100)
+
+    assert grid_path == str(tmp_path / "diagram.grid.png")
+    assert (rows, cols) == (3, 4)
+    assert not (tmp_path / "xdg").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cache_dir_reuses_overlay(tmp_path):
+    """cache_dir を渡すと、同じ内容の画像には生成済みのグリッド画像を返す"""
+    cache_dir = str(tmp_path / "grids")
+    first = add_grid_overlay(_image(tmp_path, "a.png"), min_cell_size=100, cache_dir=cache_dir)
+    mtime = os.stat(first[0]).st_mtime_ns
+
+    second = add_grid_overlay(_image(tmp_path, "b.png"), min_cell_size=100, cache_dir=cache_dir)
+
+    assert second == first
+    assert os.path.dirname(first[0]) == cache_dir
+    assert os.stat(first[0]).st_mtime_ns == mtime
+    assert not (tmp_path / "b.grid.png").exists()
+
+
+def test_concurrent_writers_do_not_share_temp_files(tmp_path):
+    """同じ出力先へ複数スレッドから同時に書いても、壊れたファイルや一時ファイルが残らない"""
+    image_path = _image(tmp_path)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: add_grid_overlay(image_path, min_cell_size=100), range(16)))
+
+    assert len(set(results)) == 1
+    with Image.open(results[0][0]) as img:
+        assert img.size == (400, 300)
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock
+
+from graphsight.pipelines.experimental.crawling.llm.cache import CachedVLM
+from graphsight.pipelines.experimental.crawling.models import (
+    ConnectedNode,
+    StepInterpretation,
+    TokenUsage,
+)
+
+
+def _image(tmp_path, name, data=b"crop-bytes"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _inner():
+    """呼ばれるたびに新しい結果と使用トークンを返すモック VLM"""
+    vlm = MagicMock()
+    vlm.query_structured.side_effect = lambda prompt, image_path, model: (
+        StepInterpretation(outgoing_edges=[ConnectedNode(target_id="B", description="B")], source_id="A"),
+        TokenUsage(input_tokens=10, output_tokens=2),
+    )
+    vlm.query_text.side_effect = lambda prompt, image_path=None: (f"text for {prompt}", TokenUsage(input_tokens=3))
+    return vlm
+
+
+def test_same_content_hits_across_temp_paths(tmp_path):
+    """同じ内容の画像なら、別の一時ファイルでも2回目はVLMに投げない"""
+    inner = _inner()
+    vlm = CachedVLM(inner)
+
+    vlm.query_structured("audit A", _image(tmp_path, "crop_1.png"), StepInterpretation)
+    vlm.query_structured("audit A", _image(tmp_path, "crop_2.png"), StepInterpretation)
+    vlm.query_structured("audit A", _image(tmp_path, "crop_3.png", b"other"), StepInterpretation)
+    vlm.query_structured("audit B", _image(tmp_path, "crop_4.png"), StepInterpretation)
+
+    assert inner.query_structured.call_count == 3
+    assert (vlm.hits, vlm.misses) == (1, 3)
+
+
+def test_hit_returns_deep_copy_without_usage(tmp_path):
+    """命中時はトークン0で、呼び出し側が書き換えても記憶している結果は変わらない"""
+    inner = _inner()
+    vlm = CachedVLM(inner)
+    image = _image(tmp_path, "crop.png")
+
+    first, usage = vlm.query_structured("audit A", image, StepInterpretation)
+    first.outgoing_edges.clear()
+    second, hit_usage = vlm.query_structured("audit A", image, StepInterpretation)
+    second.outgoing_edges[0].target_id = "X"
+    third, _ = vlm.query_structured("audit A", image, StepInterpretation)
+
+    assert usage == TokenUsage(input_tokens=10, output_tokens=2)
+    assert hit_usage == TokenUsage()
+    assert [e.target_id for e in third.outgoing_edges] == ["B"]
+    assert inner.query_structured.call_count == 1
+
+
+def test_text_queries_are_cached_without_image():
+    inner = _inner()
+    vlm = CachedVLM(inner)
+
+    assert vlm.query_text("q") == ("text for q", TokenUsage(input_tokens=3))
+    assert vlm.query_text("q") == ("text for q", TokenUsage())
+    assert inner.query_text.call_count == 1
+
+
+def test_lru_eviction_bounds_results_and_digests(tmp_path):
+    """結果も画像ハッシュも maxsize 件までしか持たず、古いものから捨てる"""
+    inner = _inner()
+    vlm = CachedVLM(inner, maxsize=2)
+    image = _image(tmp_path, "crop.png")
+
+    vlm.query_structured("p1", image, StepInterpretation)
+    vlm.query_structured("p2", image, StepInterpretation)
+    vlm.query_structured("p1", image, StepInterpretation)  # p1 を最近使ったものにする
+    vlm.query_structured("p3", image, StepInterpretation)  # p2 が捨てられる
+    vlm.query_structured("p1", image, StepInterpretation)
+    assert inner.query_structured.call_count == 3
+    vlm.query_structured("p2", image, StepInterpretation)
+    assert inner.query_structured.call_count == 4
+
+    # 一時ファイルのパスが毎回変わっても、パスごとのハッシュは増え続けない
+    for i in range(10):
+        vlm.query_structured("p1", _image(tmp_path, f"tmp_{i}.png"), StepInterpretation)
+    assert len(vlm._digests) == 2
+    assert inner.query_structured.call_count == 4
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from graphsight.pipelines.stable.draft_refine import draft_refine
+from graphsight.pipelines.stable.draft_refine.draft_refine import DraftRefinePipeline
+from graphsight.pipelines.stable.draft_refine.mermaid import MermaidParser
+from graphsight.pipelines.stable.draft_refine.models import DraftOutput, UncertainPoint
+
+BATCH = "You are verifying several specific parts"
+SINGLE = "You are verifying a specific part"
+ENHANCED_BATCH = "These are ENHANCED versions"
+
+
+def _reply(content):
+    resp = MagicMock()
+    resp.content = content if isinstance(content, str) else json.dumps(content)
+    return resp
+
+
+class FakeLLM:
+    """システムプロンプトの書き出しで応答を切り替えるモックLLM。呼び出しを種類ごとに記録する"""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        system, human = messages[0].content, messages[-1].content
+        kind = next(k for k in self.replies if system.startswith(k))
+        with self._lock:
+            self.calls.append((kind, human))
+        reply = self.replies[kind]
+        return _reply(reply(human) if callable(reply) else reply)
+
+    def kinds(self):
+        return [k for k, _ in self.calls]
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    monkeypatch.setattr(draft_refine, "ChatOpenAI", MagicMock())
+    tools = MagicMock()
+    tools.crop_region.invoke.side_effect = lambda a: str(
+        tmp_path / "crops" / f"crop_{a['x']}_{a['y']}_{a['w']}x{a['h']}.jpg"
+    )
+    tools.preprocess_image.invoke.side_effect = lambda a: a["image_path"].replace(".jpg", "_enh.jpg")
+    monkeypatch.setattr(draft_refine, "ImageProcessor", tools)
+
+    p = DraftRefinePipeline()
+    # 画像の代わりにパスだけを送る
+    monkeypatch.setattr(p, "_load_image", lambda path: [{"type": "text", "text": path}])
+    return p
+
+
+def _point(pid, x=0, y=0):
+    return UncertainPoint(id=pid, description=f"what is {pid}?", location="top", crop_x=x, crop_y=y)
+
+
+def _check(pipeline, points):
+    return pipeline._check_uncertain_points_batch("img.png", 2000, 2000, points, "graph TD\nA --> B")
+
+
+def test_batch_maps_results_by_crop_number(pipeline):
+    """応答の順序や crop 番号の型に関わらず crop 番号で対応付け、欠けた点は crop と一緒に返す"""
+    points = [_point("U1", 100), _point("U2", 600), _point("U3", 1100)]
+    pipeline.llm = FakeLLM({BATCH: {"results": [
+        {"crop": "3", "readable": True, "finding": "label is Yes", "correction": "rename"},
+        {"crop": 1, "readable": True, "finding": "arrow to B", "correction": "none"},
+        {"crop": "x", "readable": True, "finding": "junk"},
+        {"readable": True, "finding": "no crop number"},
+    ]}})
+
+    pending = _check(pipeline, points)
+
+    assert points[0].resolution == "arrow to B (draft was correct)"
+    assert points[2].resolution == "label is Yes → Correction: rename"
+    assert [(u.id, path.rsplit("/", 1)[-1]) for u, path in pending] == [("U2", "crop_500_0_400x400.jpg")]
+    assert pipeline.llm.kinds() == [BATCH]
+
+
+def test_missing_readable_goes_to_enhancement_batch(pipeline):
+    """readable が無い回答は読めなかったものとして、enhance した画像でまとめて再確認する"""
+    points = [_point("U1", 100), _point("U2", 600)]
+    pipeline.llm = FakeLLM({
+        BATCH: {"results": [
+            {"crop": 1, "finding": "blurry"},
+            {"crop": 2, "readable": False, "finding": "blurry"},
+        ]},
+        ENHANCED_BATCH: {"results": [
+            {"crop": 2, "finding": "says No", "correction": "relabel"},
+        ]},
+    })
+
+    pending = _check(pipeline, points)
+
+    assert pipeline.llm.kinds() == [BATCH, ENHANCED_BATCH]
+    assert points[1].resolution == "(after enhancement) says No → Correction: relabel"
+    # enhance 後も回答が欠けた点は、元の crop と一緒に個別確認へ回す
+    assert [(u.id, path.endswith("crop_0_0_400x400.jpg")) for u, path in pending] == [("U1", True)]
+    assert "_enh" in pipeline.llm.calls[1][1][1]["text"]
+
+
+def test_enhancement_batch_parse_failure_keeps_raw_reply(pipeline):
+    points = [_point("U1")]
+    pipeline.llm = FakeLLM({
+        BATCH: {"results": [{"crop": 1, "readable": False}]},
+        ENHANCED_BATCH: "I cannot tell",
+    })
+
+    assert _check(pipeline, points) == []
+    assert points[0].resolution == "(after enhancement) I cannot tell"
+
+
+def test_failed_batch_parse_does_not_requery_each_point(pipeline):
+    """応答全体のパースに失敗しても、全点を個別に問い合わせ直さない (N+1 回の呼び出しにしない)"""
+    points = [_point("U1", 100), _point("U2", 600), _point("U3", 1100)]
+    pipeline.llm = FakeLLM({BATCH: "not json at all", SINGLE: {"readable": True, "finding": "x"}})
+    draft = DraftOutput(mermaid_code="graph TD\nA --> B", confidence=0.5, uncertain_points=points)
+
+    pipeline._phase_refine("img.png", 2000, 2000, draft, MermaidParser.parse(draft.mermaid_code))
+
+    assert pipeline.llm.kinds() == [BATCH]
+    assert all(u.resolution.startswith("Parse error:") for u in points)
+    assert draft_refine.ImageProcessor.crop_region.invoke.call_count == 3
+
+
+def test_duplicate_crop_boxes_are_cropped_once_and_checked_in_turn(pipeline):
+    """同じ範囲の点は1回だけ crop し、個別確認でも同じ crop を同時に扱わない"""
+    points = [_point("U1", 100), _point("U2", 100), _point("U3", 100), _point("U4", 600)]
+    active = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def single(human):
+        crop_path = human[0]["text"]
+        with lock:
+            if crop_path in active:
+                overlaps.append(crop_path)
+            active.add(crop_path)
+        time.sleep(0.01)
+        with lock:
+            active.discard(crop_path)
+        return {"readable": True, "finding": "ok", "correction": "none"}
+
+    pipeline.llm = FakeLLM({BATCH: {"results": []}, SINGLE: single})
+    draft = DraftOutput(mermaid_code="graph TD\nA --> B", confidence=0.5, uncertain_points=points)
+
+    pipeline._phase_refine("img.png", 2000, 2000, draft, MermaidParser.parse(draft.mermaid_code))
+
+    assert draft_refine.ImageProcessor.crop_region.invoke.call_count == 2
+    assert pipeline.llm.kinds() == [BATCH] + [SINGLE] * 4
+    assert overlaps == []
+    assert all(u.resolution == "ok (draft was correct)" for u in points)
@@ -0,0 +1,104 @@
+import pytest
+
+from graphsight.pipelines.stable.draft_refine.mermaid import MermaidParser
+
+
+def _edges(line: str):
+    graph = MermaidParser.parse(f"graph TD\n{line}")
+    return [(e.src, e.dst, e.label, e.style) for e in graph.edges], graph
+
+
+@pytest.mark.parametrize("line, expected_edges, expected_labels", [
+    ('J["x --> y"] ==> C', [("J", "C", "", "==>")], {"J": "x --> y"}),
+    ('J["x --> y"] -.-> B', [("J", "B", "", "-.->")], {"J": "x --> y"}),
+    ('A --> B["x --> y"]', [("A", "B", "", "-->")], {"B": "x --> y"}),
+    ("A[Start] --> B[Go --- here]", [("A", "B", "", "-->")], {"B": "Go --- here"}),
+    ('A -->|x| B["a --> b"]', [("A", "B", "x", "-->")], {"B": "a --> b"}),
+    (
+        'A["x --> y"] --> B --> C("p -.-> q")',
+        [("A", "B", "", "-->"), ("B", "C", "", "-->")],
+        {"A": "x --> y", "C": "p -.-> q"},
+    ),
+])
+def test_arrow_inside_label_is_not_split(line, expected_edges, expected_labels):
+    """ラベル内の矢印ではなく、ラベルの外の矢印だけでエッジを分割する"""
+    edges, graph = _edges(line)
+    assert edges == expected_edges
+    for nid, label in expected_labels.items():
+        assert graph.nodes[nid].label == label
+
+
+def test_unclosed_label_still_splits_on_arrow():
+    """閉じカッコ欠損のラベルはマスクせず、従来どおり矢印で分割する"""
+    edges, graph = _edges("R[電話会社に --> S")
+    assert edges == [("R", "S", "", "-->")]
+    assert graph.nodes["R"].label == "電話会社に"
+
+
+@pytest.mark.parametrize("line", [
+    "A --> B",
+    "A-->B",
+    "A ==> B",
+    "A === B",
+    "A -.-> B",
+    "A --- B",
+    "A[Start] --> B{Ok?}",
+    "A --> B --> C",
+    "A ==> B -.-> C --- D",
+    "A(['s']) --> B((c)) --> C{{h}}",
+    "A -->|yes| B",
+    "B -->|No| C[End]",
+    "A ==>|x| B",
+    'A -->|x| B["a --> b"]',
+    'J["x --> y"] ==> C',
+    'A --> B["x --> y"]',
+    "A[Start] --> B[Go --- here]",
+    'A["x --> y"] --> B --> C("p -.-> q")',
+    "R[電話会社に --> S",
+    'A["a|b"] --> B',
+])
+def test_lexer_fast_path_agrees_with_regex(line):
+    """字句解析の高速パスで確定する行は、正規表現による解析と同じグラフになる"""
+    from graphsight.pipelines.stable.draft_refine.mermaid import (
+        _LineLexer, _mask_labels, GraphStructure,
+    )
+
+    masked = _mask_labels(line)
+    assert MermaidParser._split_simple_edge_line(_LineLexer(line, masked).tokens()) is not None
+
+    fast, regex = GraphStructure(), GraphStructure()
+    assert MermaidParser._try_parse_edge(line, fast, [])
+    assert MermaidParser._try_parse_edge_regex(line, regex, [])
+    assert fast.edges == regex.edges
+    assert fast.nodes == regex.nodes
+
+
+@pytest.mark.parametrize("line", [
+    "A -- yes --> B",
+    "A -->|x| B --> C",
+])
+def test_lexer_defers_ambiguous_lines_to_regex(line):
+    """インラインラベルやパイプ付きチェーンなど、優先順位に依存する行は高速パスで確定しない"""
+    from graphsight.pipelines.stable.draft_refine.mermaid import _LineLexer, _mask_labels
+
+    assert MermaidParser._split_simple_edge_line(_LineLexer(line, _mask_labels(line)).tokens()) is None
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("A[Go] -- x --- y --> B", [("A", "B", "x --- y", "-->")]),
+    ("A -- x ==> y --> B", [("A", "B", "x ==> y", "-->")]),
+    ("A -- x ==> y -.-> B", [("A", "B", "x ==> y", "-.->")]),
+    ("A -- yes --- B", [("A", "B", "yes", "---")]),
+    ("A -- maybe -.->> B", [("A", "B", "maybe", "-.->")]),
+])
+def test_inline_label_tries_arrows_in_priority_order(line, expected):
+    """インラインラベル構文は矢印の種類ごとに優先順で試し、ラベルは最初の矢印で切れない"""
+    edges, _ = _edges(line)
+    assert edges == expected
+
+
+def test_unclosed_label_does_not_swallow_the_next_label():
+    """閉じカッコ欠損のラベルが後ろのラベルの閉じカッコまで呑み込まない"""
+    edges, graph = _edges("R[電話会社に --> S[窓口]")
+    assert edges == [("R", "S", "", "-->")]
+    assert graph.nodes["S"].label == "窓口"
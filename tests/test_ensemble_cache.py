@@ -0,0 +1,66 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from graphsight.pipelines.experimental.ensemble import ensemble
+from graphsight.pipelines.experimental.ensemble.ensemble import GraphSightAgent, LLMResponseCache
+
+
+def _reply(content: str):
+    resp = MagicMock()
+    resp.content = content
+    return resp
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(ensemble, "ChatOpenAI", MagicMock())
+    with GraphSightAgent(model="test-model") as a:
+        yield a
+
+
+def test_cache_key_covers_model_system_and_human():
+    image = [{"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AAAA"}}]
+    base = LLMResponseCache.key("m", "sys", image)
+
+    assert base == LLMResponseCache.key("m", "sys", [dict(image[0])])
+    assert base != LLMResponseCache.key("other", "sys", image)
+    assert base != LLMResponseCache.key("m", "sys2", image)
+    assert base != LLMResponseCache.key("m", "sys", None)
+
+
+def test_disk_cache_is_opt_in(agent, tmp_path):
+    assert agent._cache._dir is None
+
+    cache = LLMResponseCache(str(tmp_path / "cache"))
+    key = LLMResponseCache.key("m", "sys")
+    cache.put(key, '{"a": 1}')
+
+    assert json.loads((tmp_path / "cache" / f"{key}.json").read_text())["content"] == '{"a": 1}'
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+    assert LLMResponseCache(str(tmp_path / "cache")).get(key) == '{"a": 1}'
+
+
+def test_repeated_call_is_served_from_cache(agent):
+    agent.llm.invoke.return_value = _reply('```json\n{"mermaid": "graph TD\\nA --> B"}\n```')
+
+    first = agent._invoke_json("sys", "human")
+    second = agent._invoke_json("sys", "human")
+
+    assert first == second == {"mermaid": "graph TD\nA --> B"}
+    assert agent.llm.invoke.call_count == 1
+
+    agent._invoke_json("other sys", "human")
+    assert agent.llm.invoke.call_count == 2
+
+
+def test_malformed_response_is_not_cached(agent):
+    agent.llm.invoke.side_effect = [_reply("not json"), _reply('{"mapping": {"X": "A"}}')]
+
+    with pytest.raises(ValueError):
+        agent._invoke_json("sys")
+    assert agent._cache.get(LLMResponseCache.key("test-model", "sys")) is None
+
+    assert agent._invoke_json("sys") == {"mapping": {"X": "A"}}
+    assert agent.llm.invoke.call_count == 2
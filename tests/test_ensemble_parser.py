@@ -0,0 +1,39 @@
+import pytest
+
+from graphsight.pipelines.experimental.ensemble.ensemble import MermaidParser
+
+
+def _parse(line: str):
+    graph = MermaidParser.parse(f"graph TD\n{line}")
+    return [(e.src, e.dst, e.label, e.style) for e in graph.edges], graph
+
+
+@pytest.mark.parametrize("line, expected_edges, expected_labels", [
+    ('A --> B["x --> y"]', [("A", "B", "", "-->")], {"B": '"x --> y"'}),
+    ("A[Start] --> B[Go --- here]", [("A", "B", "", "-->")], {"B": "Go --- here"}),
+    ('J["x --> y"] ==> C', [("J", "C", "", "==>")], {"J": '"x --> y"'}),
+    ('A -->|yes| B["p -.-> q"]', [("A", "B", "yes", "-->")], {"B": '"p -.-> q"'}),
+    ('A -- t --> B["p --> q"]', [("A", "B", "t", "-->")], {"B": '"p --> q"'}),
+    (
+        "A[a --> b] --> B --> C{c -.-> d}",
+        [("A", "B", "", "-->"), ("B", "C", "", "-->")],
+        {"A": "a --> b", "C": "c -.-> d"},
+    ),
+])
+def test_arrow_inside_label_is_not_a_chain(line, expected_edges, expected_labels):
+    """Arrows inside node labels neither split the edge nor turn it into a chain."""
+    edges, graph = _parse(line)
+    assert edges == expected_edges
+    for nid, label in expected_labels.items():
+        assert graph.nodes[nid].label == label
+
+
+def test_chain_still_splits_on_every_arrow():
+    edges, _ = _parse("A --> B -.-> C ==> D")
+    assert edges == [("A", "B", "", "-->"), ("B", "C", "", "-.->"), ("C", "D", "", "==>")]
+
+
+def test_unclosed_label_does_not_swallow_the_next_one():
+    """An unclosed label is left unmasked, so the line splits as it did before."""
+    edges, _ = _parse("R[broken --> S[ok]")
+    assert edges == [("Rbroken", "S", "", "-->")]
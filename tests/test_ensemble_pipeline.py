@@ -0,0 +1,102 @@
+import itertools
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from graphsight.pipelines.experimental.ensemble import ensemble
+from graphsight.pipelines.experimental.ensemble.ensemble import GraphSightAgent
+
+IMAGE = [{"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AAAA"}}]
+
+DRAFTS = {
+    "Structuralist": "graph TD\nStart[Begin] --> Check{Valid?}\nCheck -->|yes| Done([End])",
+    "Optimist": "graph TD\nA[Begin] --> B{Valid?}\nB -->|no| C[Retry]\nC --> A",
+    "Pessimist": "graph LR\nX[Begin] --> Y{Valid?}\nY --> Z[Done]",
+}
+# Keyed by a line of the draft's node list ("List B" in the mapping prompt)
+MAPPINGS = {
+    "- A: Begin": {"A": "Start", "B": "Check"},
+    "- X: Begin": {"X": "Start", "Y": "Check", "Z": "Done"},
+}
+
+
+class StubLLM:
+    """Answers draft prompts per persona (after a per-persona delay) and mapping prompts per draft."""
+
+    def __init__(self, drafts, delays=None):
+        self.drafts = drafts
+        self.delays = delays or {}
+        self.mapping_calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        system = messages[0].content
+        resp = MagicMock()
+        if system.startswith("You are the "):
+            name = system[len("You are the "):].split(".", 1)[0]
+            time.sleep(self.delays.get(name, 0))
+            resp.content = json.dumps({"mermaid": self.drafts[name]})
+            return resp
+        with self._lock:
+            self.mapping_calls += 1
+        mapping = next(m for key, m in MAPPINGS.items() if key in system)
+        resp.content = json.dumps({"mapping": mapping})
+        return resp
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setattr(ensemble, "ChatOpenAI", MagicMock())
+    agents = []
+
+    def make(drafts=DRAFTS, delays=None):
+        agent = GraphSightAgent(model="test-model")
+        agent.llm = StubLLM(drafts, delays)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for a in agents:
+        a.close()
+
+
+def _sequential(agent):
+    """Reference path: all drafts, then normalization against the anchor, then the union merge."""
+    drafts = {}
+    for name, role in agent.PERSPECTIVES.items():
+        name, graph = agent._draft(name, role, IMAGE)
+        if graph.nodes:
+            drafts[name] = graph
+    if "Structuralist" in drafts:
+        normalize = agent._id_normalizer(drafts["Structuralist"])
+        drafts = dict(normalize(n, g) if n != "Structuralist" else (n, g) for n, g in drafts.items())
+    return agent._merge_union(drafts).to_mermaid()
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(DRAFTS)))
+def test_pipelined_drafts_match_sequential(make_agent, order):
+    # Drafts finish in `order`, so the anchor may arrive first, in between, or last
+    delays = {name: 0.01 * i for i, name in enumerate(order)}
+    agent = make_agent(delays=delays)
+
+    merged = agent._merge_union(agent._draft_and_normalize(IMAGE)).to_mermaid()
+
+    assert merged == _sequential(make_agent())
+    assert agent.llm.mapping_calls == 2
+    assert "Start -->|no| C" not in merged and "Check -->|no| C" in merged
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(DRAFTS)))
+def test_without_anchor_drafts_are_merged_unmapped(make_agent, order):
+    drafts = dict(DRAFTS, Structuralist="graph TD")  # no nodes -> no anchor
+    delays = {name: 0.01 * i for i, name in enumerate(order)}
+    agent = make_agent(drafts, delays)
+
+    normalized = agent._draft_and_normalize(IMAGE)
+
+    assert sorted(normalized) == ["Optimist", "Pessimist"]
+    assert agent._merge_union(normalized).to_mermaid() == _sequential(make_agent(drafts))
+    assert agent.llm.mapping_calls == 0